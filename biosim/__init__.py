@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the BioSim package written for the INF200 project January 2019.
+The simulation is in 'biosim.simulation' and the 'biosim' command in
+'biosim.cli'.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
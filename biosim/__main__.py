@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+"""
+Runs the 'biosim' command, as 'python -m biosim'.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import sys
+from biosim.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the command-line model which functions with the BioSim package
+written for the INF200 project January 2019..
+
+Usage:
+    biosim scenario.json [--engine arrays] [--processes 4]
+                         [--output result.npz] [--format npz]
+
+The scenario file is a JSON object with the keys:
+    'map':        the island map, as a string or a list of lines;
+    'ini_pop':    the initial population, as given to BioSim;
+    'params':     optional, {'Herbivore': {...}, 'J': {...}, ...};
+    'injections': optional, [{'year': 50, 'population': [...]}, ...],
+                  the populations, given like 'ini_pop', added after
+                  the given number of years, less than 'years';
+    'years':      the number of years to simulate;
+    'seed' or 'seeds': one seed or a list of seeds;
+    'engine':     optional, 'objects' or 'arrays';
+    'output':     optional, {'path': ..., 'format': 'npz' or 'json'},
+                  the format taken from the extension if not given.
+
+The run is headless and the run metrics are printed to the standard
+output as one JSON object.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+from .island import Island
+from .ensemble import run_scenario, current_parameters, \
+    apply_parameters
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+OUTPUT_FORMATS = ('npz', 'json')
+
+
+def load_scenario(filename, engine=None):
+    """This function reads and checks a scenario file, such that an
+    invalid scenario is refused before any year is simulated. The
+    parameters are checked by setting them on the classes, which are
+    restored afterwards.
+
+    Parameters:
+    ----------
+        filename: str
+
+        engine: str or None
+            The engine overriding the one of the file, if not None.
+
+    Returns:
+    ----------
+        Dictionary with the scenario, where 'map' is a string, 'seeds'
+        a list, 'params' every parameter of the species and landscapes,
+        those of the file merged into the current ones, and
+        'injections' a dictionary with the years on keys and the
+        populations on values.
+    """
+    with open(filename) as file:
+        scenario = json.load(file)
+    for key in ('map', 'ini_pop', 'years'):
+        if key not in scenario:
+            raise ValueError('The scenario has no *{}*'.format(key))
+    if not isinstance(scenario['years'], int) or scenario['years'] < 0:
+        raise ValueError('*{}* years is not a non-negative '
+                         'integer'.format(scenario['years']))
+    if not isinstance(scenario['map'], str):
+        scenario['map'] = '\n'.join(scenario['map'])
+    if 'seeds' not in scenario:
+        scenario['seeds'] = [scenario.get('seed')]
+    scenario['params'] = current_parameters(scenario.get('params'))
+    saved = current_parameters()
+    try:
+        apply_parameters(scenario['params'])
+    finally:
+        apply_parameters(saved)
+    if engine is not None:
+        scenario['engine'] = engine
+    scenario.setdefault('engine', 'objects')
+    scenario.setdefault('output', {})
+
+    island = Island(scenario['map'], scenario['engine'])
+    island.add_population(tuple_locs(scenario['ini_pop']))
+    injections = {}
+    for injection in scenario.get('injections', []):
+        year = injection['year']
+        if not isinstance(year, int) or \
+                not 0 <= year < scenario['years']:
+            raise ValueError('The injection year *{}* is not in the '
+                             '{} years simulated'.format(
+                                 year, scenario['years']))
+        population = tuple_locs(injection['population'])
+        island.add_population(population)
+        injections.setdefault(year, []).extend(population)
+    scenario['injections'] = injections
+    return scenario
+
+
+def tuple_locs(population):
+    """This function converts the JSON lists of the coordinates of a
+    population in tuples.
+
+    Parameters:
+    ----------
+        population: list
+            The population, given like 'ini_pop'.
+
+    Returns:
+    ----------
+        The population.
+    """
+    for unit in population:
+        unit['loc'] = tuple(unit['loc'])
+    return population
+
+
+def run_seed(task):
+    """This function runs, headless, the scenario with one seed. The
+    parameters of the species and landscapes are restored afterwards.
+
+    Parameters:
+    ----------
+        task: tuple
+            The scenario, as given by 'load_scenario()', and the seed.
+
+    Returns:
+    ----------
+        2D array with the number of animals of each specie, in the
+        order of 'Island.fauna_classes', at the end of each year.
+    """
+    scenario, seed = task
+    saved = current_parameters()
+    apply_parameters(scenario['params'])
+    try:
+        return run_scenario(scenario['map'], scenario['ini_pop'],
+                            scenario['engine'], seed, scenario['years'],
+                            scenario['injections'])
+    finally:
+        apply_parameters(saved)
+
+
+def peak_rss_mb():
+    """This function returns the peak resident set size of this
+    process and of its finished child processes, in megabytes.
+
+    Returns:
+    ----------
+        float, or None where the resource module is not available.
+    """
+    if resource is None:
+        return None
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return max(resource.getrusage(who).ru_maxrss
+               for who in (resource.RUSAGE_SELF,
+                           resource.RUSAGE_CHILDREN)) / scale
+
+
+def write_output(path, output_format, seeds, totals):
+    """This function writes the species totals of each seed and year.
+
+    Parameters:
+    ----------
+        path: str
+
+        output_format: str
+            'npz' or 'json'.
+
+        seeds: list
+
+        totals: array
+            3D array with the species totals of the seed i, in the
+            year j, at [i, j].
+
+    Returns:
+    ----------
+        The path of the file written, to which NumPy adds '.npz' if
+        missing in the npz format.
+    """
+    species = list(Island.fauna_classes.keys())
+    if output_format == 'npz':
+        if not path.endswith('.npz'):
+            path += '.npz'
+        np.savez_compressed(path, seeds=np.array(seeds, dtype=float),
+                            species=np.array(species), totals=totals)
+    else:
+        with open(path, 'w') as file:
+            json.dump({'seeds': seeds, 'species': species,
+                       'totals': totals.tolist()}, file)
+    return path
+
+
+def output_format_of(path, output_format=None):
+    """This function returns the format of the output file, taken from
+    its extension if not given.
+
+    Parameters:
+    ----------
+        path: str
+
+        output_format: str or None
+
+    Returns:
+    ----------
+        'npz' or 'json'.
+    """
+    if output_format is not None:
+        return output_format
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in OUTPUT_FORMATS else 'npz'
+
+
+def parse_args(argv):
+    """This function parses the command-line arguments.
+
+    Parameters:
+    ----------
+        argv: list
+
+    Returns:
+    ----------
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog='biosim', description='Runs a BioSim scenario headless.')
+    parser.add_argument('scenario', help='JSON scenario file')
+    parser.add_argument('--engine', choices=Island.engines,
+                        help='population storage engine')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='number of worker processes for the seeds')
+    parser.add_argument('--output', help='file of the species totals')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                        help='format of the output file, by default '
+                             'taken from its extension')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """This function is the entry point of the 'biosim' command.
+
+    Parameters:
+    ----------
+        argv: list or None
+            The arguments, sys.argv[1:] if None.
+
+    Returns:
+    ----------
+        The exit status.
+    """
+    args = parse_args(argv)
+    try:
+        scenario = load_scenario(args.scenario, args.engine)
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        print('biosim: invalid scenario: {}'.format(err), file=sys.stderr)
+        return 2
+
+    seeds = scenario['seeds']
+    tasks = [(scenario, seed) for seed in seeds]
+    start = time.perf_counter()
+    if args.processes > 1 and len(tasks) > 1:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(min(args.processes, len(tasks))) as pool:
+            totals = np.stack(pool.map(run_seed, tasks))
+    else:
+        totals = np.stack([run_seed(task) for task in tasks])
+    wall_time = time.perf_counter() - start
+
+    path = args.output or scenario['output'].get('path')
+    if path is not None:
+        output_format = output_format_of(
+            path, args.format or scenario['output'].get('format'))
+        path = write_output(path, output_format, seeds, totals)
+
+    years = scenario['years'] * len(seeds)
+    species = list(Island.fauna_classes.keys())
+    print(json.dumps({
+        'engine': scenario['engine'],
+        'seeds': len(seeds),
+        'processes': args.processes,
+        'years': years,
+        'wall_time_s': wall_time,
+        'years_per_s': years / wall_time if wall_time > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'final_totals': dict(zip(species, totals[:, -1].mean(
+            axis=0).tolist())) if scenario['years'] else None,
+        'output': path}))
+    return 0
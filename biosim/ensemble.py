@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the ensemble model which functions with the BioSim package
+written for the INF200 project January 2019..
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import os
+import multiprocessing
+import numpy as np
+from .island import Island
+
+_scenario = {}
+
+
+def parameter_classes():
+    """This function returns the classes of the species and landscapes
+    whose parameters can be set.
+
+    Returns:
+    ----------
+        Dictionary with the species names or landscape letters on keys
+        and classes on values.
+    """
+    return dict(**Island.fauna_classes, **Island.geo_classes)
+
+
+def current_parameters(params=None):
+    """This function returns the parameters the species and landscapes
+    have in the calling process, with the given parameters merged in,
+    such that the worker processes, which start with the defaults, can
+    be given the parameters of the calling process.
+
+    Parameters:
+    ----------
+        params: dict or None
+            Dictionary with the species names or landscape letters on
+            keys and parameter dictionaries on values.
+
+    Returns:
+    ----------
+        Dictionary like 'params', with every parameter of each species
+        and landscape having any.
+    """
+    classes = parameter_classes()
+    merged = {param_key: dict(cls.parameters)
+              for param_key, cls in classes.items() if cls.parameters}
+    for param_key, values in ({} if params is None else params).items():
+        classes[param_key].check_unknown_parameters(values)
+        merged[param_key].update(values)
+    return merged
+
+
+def apply_parameters(params):
+    """This function sets the class parameters of the species and
+    landscapes in the calling process.
+
+    Parameters:
+    ----------
+        params: dict
+            Dictionary with the species names or landscape letters on
+            keys and parameter dictionaries on values.
+    """
+    classes = parameter_classes()
+    for param_key, values in params.items():
+        classes[param_key].set_parameters(values)
+
+
+def init_worker(island_map, ini_pop, params, engine):
+    """This function runs once in each worker process. It keeps the
+    scenario shared by all the replicas of the worker, so it is sent
+    once per worker instead of once per replica, and sets the
+    parameters of the species and landscapes.
+
+    Parameters:
+    ----------
+        island_map: str
+
+        ini_pop: list
+
+        params: dict
+            Dictionary with the species names or landscape letters on
+            keys and parameter dictionaries on values.
+
+        engine: str
+    """
+    _scenario.update(island_map=island_map, ini_pop=ini_pop,
+                     engine=engine)
+    apply_parameters(params)
+
+
+def run_replica(task):
+    """This function runs, headless, one replica of the scenario of the
+    worker.
+
+    Parameters:
+    ----------
+        task: tuple
+            The index, the seed and the number of years of the replica.
+
+    Returns:
+    ----------
+        The index and a 2D array with the number of animals of each
+        specie, in the order of 'Island.fauna_classes', at the end of
+        each year.
+    """
+    index, seed, num_years = task
+    return index, run_scenario(_scenario['island_map'],
+                               _scenario['ini_pop'], _scenario['engine'],
+                               seed, num_years)
+
+
+def run_scenario(island_map, ini_pop, engine, seed, num_years,
+                 injections=None):
+    """This function runs a scenario headless, with the parameters the
+    species and landscapes have in the calling process.
+
+    Parameters:
+    ----------
+        island_map: str
+
+        ini_pop: list
+
+        engine: str
+
+        seed: int or None
+
+        num_years: int
+
+        injections: dict or None
+            Dictionary with numbers of years on keys and populations,
+            given like 'ini_pop', on values, each added after its
+            number of years.
+
+    Returns:
+    ----------
+        2D array with the number of animals of each specie, in the
+        order of 'Island.fauna_classes', at the end of each year.
+    """
+    injections = {} if injections is None else injections
+    island = Island(island_map, engine, seed)
+    island.add_population(ini_pop)
+    totals = np.zeros((num_years, len(island.fauna_classes)),
+                      dtype=np.int64)
+    for year in range(num_years):
+        if year in injections:
+            island.add_population(injections[year])
+        island.yearly_cycle()
+        totals[year] = island.totals
+    return totals
+
+
+class BioSimEnsemble:
+    """Runner of the same scenario with many seeds, whose replicas run
+    headless in a pool of worker processes, giving the mean and the
+    quantiles of the species totals of each year over the replicas."""
+
+    def __init__(self, island_map, ini_pop, seeds, params=None,
+                 engine='objects', processes=None):
+        """Constructor for the BioSimEnsemble class.
+
+        Parameters:
+        ----------
+            island_map: str
+
+            ini_pop: list
+
+            seeds: list
+                One seed per replica.
+
+            params: dict or None
+                Dictionary with the species names or landscape letters
+                on keys and parameter dictionaries on values, e.g.,
+                {'Carnivore': {'F': 40.0}, 'J': {'f_max': 700.0}},
+                merged into the parameters the species and landscapes
+                have when the ensemble is created, which the replicas
+                run with.
+
+            engine: str
+
+            processes: int or None
+                Number of worker processes, the number of cores if
+                None.
+        """
+        Island(island_map, engine).add_population(ini_pop)
+        self.island_map = island_map
+        self.ini_pop = ini_pop
+        self.seeds = list(seeds)
+        self.params = current_parameters(params)
+        self.engine = engine
+        self.processes = os.cpu_count() if processes is None \
+            else processes
+        self.species = list(Island.fauna_classes.keys())
+
+    def iter_runs(self, num_years):
+        """This method runs the replicas in the pool and yields the
+        species totals of each replica as soon as it ends.
+
+        Parameters:
+        ----------
+            num_years: int
+
+        Yields:
+        ----------
+            The index of the replica in 'seeds' and the 2D array with
+            its species totals of each year.
+        """
+        context = multiprocessing.get_context('spawn')
+        tasks = [(index, seed, num_years)
+                 for index, seed in enumerate(self.seeds)]
+        with context.Pool(min(self.processes, len(tasks)) or 1,
+                          init_worker,
+                          (self.island_map, self.ini_pop, self.params,
+                           self.engine)) as pool:
+            for index, totals in pool.imap_unordered(run_replica, tasks):
+                yield index, totals
+
+    def run(self, num_years, quantiles=(0.05, 0.5, 0.95)):
+        """This method runs all the replicas and aggregates the species
+        totals of each year.
+
+        Parameters:
+        ----------
+            num_years: int
+
+            quantiles: tuple
+                The quantiles calculated over the replicas.
+
+        Returns:
+        ----------
+            Dictionary with:
+                'years': array with the years 1 to num_years;
+                'totals': 3D array with the species totals of the
+                          replica i, in the year j, at [i, j];
+                'mean': dictionary with the species on keys and the
+                        mean totals of each year on values;
+                'quantiles': dictionary with the quantiles on keys and
+                             dictionaries like 'mean' on values.
+        """
+        totals = np.zeros((len(self.seeds), num_years,
+                           len(self.species)), dtype=np.int64)
+        for index, replica_totals in self.iter_runs(num_years):
+            totals[index] = replica_totals
+        mean = totals.mean(axis=0)
+        result = {'years': np.arange(1, num_years + 1),
+                  'totals': totals,
+                  'mean': {species: mean[:, i]
+                           for i, species in enumerate(self.species)},
+                  'quantiles': {}}
+        for q in quantiles:
+            values = np.quantile(totals, q, axis=0)
+            result['quantiles'][q] = {
+                species: values[:, i]
+                for i, species in enumerate(self.species)}
+        return result
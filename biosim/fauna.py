@@ -8,10 +8,34 @@ for the INF200 project January 2019..
 __author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
 __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 
-import numba
+import functools
 import numpy as np
 
 
+def lazy_jit(function):
+    """Decorator which compiles the function with numba.jit the first
+    time it is called, so numba is only imported when the compiled
+    function is used.
+
+    Parameters:
+    ----------
+        function: function
+
+    Returns:
+    ----------
+        The wrapped function.
+    """
+    compiled = []
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        if not compiled:
+            import numba
+            compiled.append(numba.jit(function))
+        return compiled[0](*args)
+    return wrapper
+
+
 class Population:
     parameters = {}
 
@@ -20,13 +44,50 @@ class Population:
         self.age = age
         self.weight = np.random.normal(self.parameters['w_birth'],
                                        self.parameters['sigma_birth']) \
-            if self.age is 0 else weight
-
-        self.fitness = self.calculate_fitness(self.age, self.weight,
-                                              self.parameters)
+            if weight is None else weight
+
+    @property
+    def age(self):
+        """The age of the animal. Changing it outdates the fitness."""
+        return self._age
+
+    @age.setter
+    def age(self, age):
+        self._age = age
+        self._fitness = None
+
+    @property
+    def weight(self):
+        """The weight of the animal. Changing it outdates the
+        fitness."""
+        return self._weight
+
+    @weight.setter
+    def weight(self, weight):
+        self._weight = weight
+        self._fitness = None
+
+    @property
+    def fitness(self):
+        """The fitness of the animal. It is cached and only
+        calculated again, by the method 'update_fitness()', when read
+        after the age or the weight have changed."""
+        if self._fitness is None:
+            self.update_fitness()
+        return self._fitness
+
+    @fitness.setter
+    def fitness(self, phi):
+        self._fitness = phi
+
+    @property
+    def fitness_outdated(self):
+        """True if the age or the weight changed since the fitness
+        was last calculated."""
+        return self._fitness is None
 
     @staticmethod
-    @numba.jit
+    @lazy_jit
     def fit_formula(sign, x, x_half, phi_x):
         """This method returns the fitness formula used to calculate
         the physical condition (fitness) of an animal (pop_object).
@@ -79,7 +140,7 @@ class Population:
         ----------
             phi: int or float
         """
-        if weight is 0:
+        if weight <= 0:
             phi = 0
         else:
             phi = cls.fit_formula(1, age,
@@ -91,6 +152,41 @@ class Population:
         cls.check__phi_borders(phi)
         return phi
 
+    @staticmethod
+    def batch_fitness(ages, weights, parameters):
+        """This method calculates, in one vectorized call, the fitness
+        of many animals of the same species, using the same formula as
+        'calculate_fitness()'.
+
+        Formula and conditions:
+        ----------
+            phi = 0 if 'weight' <= 0
+                  else: 1 / (1 + e^{'phi_age' * ('age' - 'a_half')}) X
+                        1 / (1 + e^{-'phi_weight' * ('weight' -
+                        'w_half')})
+
+        Parameters:
+        ----------
+            ages: list or array
+
+            weights: list or array
+
+            parameters: dict
+                The parameters of the species.
+
+        Returns:
+        ----------
+            Array with the fitness of each animal.
+        """
+        ages = np.asarray(ages, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        with np.errstate(over='ignore'):
+            phi = 1.0 / (1 + np.exp(parameters['phi_age'] *
+                                    (ages - parameters['a_half']))) \
+                / (1 + np.exp(-parameters['phi_weight'] *
+                              (weights - parameters['w_half'])))
+        return np.where(weights > 0, phi, 0.0)
+
     @classmethod
     def check__phi_borders(cls, phi):
         """Check if the _phi calculated by the method
@@ -132,35 +228,50 @@ class Population:
 
     def gain_weight(self, amount_eaten):
         """This method increases the weight of the animal, in yearly
-        basis, by the amount eaten times 'beta'.
+        basis, by the amount eaten times 'beta'. The fitness is
+        outdated and calculated again when next read.
 
         Parameters:
         ----------
             amount_eaten: int or float
         """
         self.weight += self.parameters['beta'] * amount_eaten
-        self.update_fitness()
 
     def update_weight_after_birth(self, newborn_weight):
         """This method, when called, updates the with of the animal
         after gives birth, according to the formula: 'xi' * the baby
-        weight. Then it updates the fitness.
+        weight. The fitness is outdated and calculated again when next
+        read.
 
         Parameters:
         ----------
             newborn_weight: int or float
         """
         self.weight -= self.parameters['xi'] * newborn_weight
-        self.update_fitness()
 
     def update_fitness(self):
         """This method updates the calculation of the parameter
         fitness of the animal."""
-        self.fitness = self.calculate_fitness(self.age,
-                                              self.weight,
-                                              self.parameters)
+        self._fitness = self.calculate_fitness(self._age,
+                                               self._weight,
+                                               self.parameters)
+
+    @staticmethod
+    def uniform(rnd=None):
+        """This method returns the uniform random number given by the
+        landscape cell or, if None, draws one from numpy.random.
 
-    def birth(self, number_specie_objects):
+        Parameters:
+        ----------
+            rnd: float or None
+
+        Returns:
+        ----------
+            float
+        """
+        return np.random.random() if rnd is None else rnd
+
+    def birth(self, number_specie_objects, rnd=None):
         """This method calculates the probability of giving birth
         according to the following conditions:
 
@@ -181,6 +292,10 @@ class Population:
         ----------
             number_specie_objects: int or float
 
+            rnd: float or None
+                Uniform random number in [0, 1) drawn by the landscape
+                cell, or None to draw it from numpy.random.
+
         Returns:
         ----------
             True if the animal gives birth else False.
@@ -194,9 +309,9 @@ class Population:
             p = min(1, self.parameters['gamma'] * self.fitness *
                     (number_specie_objects - 1))
 
-        return np.random.random() < p and self.weight > k
+        return self.uniform(rnd) < p and self.weight > k
 
-    def will_kill(self, prey_fitness):
+    def will_kill(self, prey_fitness, rnd=None):
         """This method decides if a Carnivore will kill a prey
         (Herbivore) according to the following conditions:
 
@@ -216,6 +331,10 @@ class Population:
         ----------
             prey_fitness: int or float
 
+            rnd: float or None
+                Uniform random number in [0, 1) drawn by the landscape
+                cell, or None to draw it from numpy.random.
+
         Returns:
         ----------
             True if herbivore is killer else False.
@@ -231,9 +350,9 @@ class Population:
         else:
             p = 1
 
-        return np.random.random() < p
+        return self.uniform(rnd) < p
 
-    def will_migrate(self):
+    def will_migrate(self, rnd=None):
         """This method calculates the probability of moving to a
         habitable neighbour cell. This takes in consideration the
         parameter 'mu' times the animal fitness. Both species have the
@@ -241,18 +360,25 @@ class Population:
 
         Formula and conditions:
         ----------
-            -> If np.random.random() number is less than the migrating
+            -> If the random number is less than the migrating
                probability, then an animal migrates, else does not.
 
+        Parameters:
+        ----------
+            rnd: float or None
+                Uniform random number in [0, 1) drawn by the landscape
+                cell, or None to draw it from numpy.random.
+
         Returns
         ----------
             True if an animal migrates else False.
         """
-        return np.random.random() < self.parameters['mu'] * self.fitness
+        return self.uniform(rnd) < self.parameters['mu'] * self.fitness
 
     def get_old(self):
         """This method increases the age of the animal, in yearly
-        basis, by 1 year."""
+        basis, by 1 year. The fitness is outdated and calculated again
+        when next read."""
         self.age += 1
 
     def lose_weight(self):
@@ -264,27 +390,33 @@ class Population:
             -> weight_loss_rate: 'eta' * 'weight';
             -> yearly_weight_loss: 'weight' - 'weight_loss_rate';
             -> After the weight is decreased, the fitness of the
-               animal is updated by the method 'update_fitness()'.
+               animal is outdated and calculated again by the method
+               'update_fitness()' when next read.
         """
         self.weight -= self.parameters['eta'] * self.weight
-        self.update_fitness()
 
-    def will_die(self):
+    def will_die(self, rnd=None):
         """An animal dies:
 
         Formula and conditions:
         ----------
             -> If its fitness is 0, or
             -> With probability if 'omega' * (1 - animal_fitness).
-            -> If np.random.random() number is less than the die
+            -> If the random number is less than the die
                probability, then an animal dies, else does not.
 
+        Parameters:
+        ----------
+            rnd: float or None
+                Uniform random number in [0, 1) drawn by the landscape
+                cell, or None to draw it from numpy.random.
+
         Returns
         ----------
             True if the animal dies else False.
          """
-        return True if self.fitness is 0 else \
-            np.random.random() < self.parameters['omega'] * (
+        return True if self.fitness == 0 else \
+            self.uniform(rnd) < self.parameters['omega'] * (
                     1 - self.fitness)
 
 
@@ -314,3 +446,219 @@ class Carnivore(Population):
     def __init__(self, age=0, weight=None):
         """Constructor for Carnivore class."""
         super().__init__(age, weight)
+
+
+class Herd:
+    """Structure-of-arrays storage of the animals of one species living
+    in a landscape cell. Instead of one Population object per animal,
+    the ages, weights and fitnesses are kept in contiguous NumPy
+    columns and every yearly rule is applied to the whole herd at
+    once."""
+
+    def __init__(self, species, age=(), weight=()):
+        """Constructor for the Herd class.
+
+        Parameters:
+        ----------
+            species: <class 'type'>
+                The fauna class, i.e., Herbivore or Carnivore;
+
+            age: list or array
+                The ages of the animals;
+
+            weight: list or array
+                The weights of the animals.
+        """
+        self.species = species
+        self.age = np.asarray(age, dtype=np.int64)
+        self.weight = np.asarray(weight, dtype=float)
+        self._fitness = None
+
+    def __len__(self):
+        """Number of animals in the herd."""
+        return len(self.age)
+
+    @property
+    def parameters(self):
+        """The parameters of the species of the herd."""
+        return self.species.parameters
+
+    @property
+    def fitness(self):
+        """The fitness column of the herd. It is cached and only
+        calculated again, by the method 'update_fitness()', when read
+        after the ages or the weights have changed."""
+        if self._fitness is None:
+            self.update_fitness()
+        return self._fitness
+
+    def update_fitness(self):
+        """This method updates the fitness column of the herd in one
+        call of 'batch_fitness()'."""
+        self._fitness = self.species.batch_fitness(self.age, self.weight,
+                                                   self.parameters)
+
+    def add(self, age, weight):
+        """This method appends new animals to the herd.
+
+        Parameters:
+        ----------
+            age: list or array
+
+            weight: list or array
+        """
+        self.extend(Herd(self.species, age, weight))
+
+    def extend(self, other):
+        """This method appends the animals of another herd of the same
+        species to this herd.
+
+        Parameters:
+        ----------
+            other: Herd
+        """
+        if len(other) > 0:
+            if self._fitness is not None and other._fitness is not None:
+                self._fitness = np.concatenate((self._fitness,
+                                                other._fitness))
+            else:
+                self._fitness = None
+            self.age = np.concatenate((self.age, other.age))
+            self.weight = np.concatenate((self.weight, other.weight))
+
+    def keep(self, mask):
+        """This method compacts the herd keeping only the animals
+        selected by a boolean mask or an index array.
+
+        Parameters:
+        ----------
+            mask: array
+        """
+        self.age = self.age[mask]
+        self.weight = self.weight[mask]
+        if self._fitness is not None:
+            self._fitness = self._fitness[mask]
+
+    def select(self, mask):
+        """This method copies the animals selected by a boolean mask or
+        an index array into a new herd.
+
+        Parameters:
+        ----------
+            mask: array
+
+        Returns:
+        ----------
+            Herd with the selected animals.
+        """
+        selected = Herd(self.species, self.age[mask], self.weight[mask])
+        if self._fitness is not None:
+            selected._fitness = self._fitness[mask]
+        return selected
+
+    def take(self, mask):
+        """This method removes the animals selected by a boolean mask
+        from the herd and returns them as a new herd.
+
+        Parameters:
+        ----------
+            mask: array
+
+        Returns:
+        ----------
+            Herd with the removed animals.
+        """
+        taken = self.select(mask)
+        self.keep(~mask)
+        return taken
+
+    def sort_by_fitness(self, reverse=False):
+        """This method orders the herd by fitness, from the worst to
+        the greatest, or from the greatest to the worst if reverse is
+        True. Equal fitnesses keep their relative order.
+
+        Parameters:
+        ----------
+            reverse: bool
+        """
+        key = -self.fitness if reverse else self.fitness
+        self.keep(np.argsort(key, kind='stable'))
+
+    def gain_weight(self, amount_eaten):
+        """This method increases the weight of each animal by the
+        amount eaten times 'beta'.
+
+        Parameters:
+        ----------
+            amount_eaten: array
+        """
+        self.weight += self.parameters['beta'] * amount_eaten
+        self._fitness = None
+
+    def lose_weight(self):
+        """This method decreases the weight of each animal by 'eta'
+        times its weight."""
+        self.weight -= self.parameters['eta'] * self.weight
+        self._fitness = None
+
+    def get_old(self):
+        """This method increases the age of each animal by 1 year."""
+        self.age += 1
+        self._fitness = None
+
+    def give_birth(self, rng):
+        """This method applies the birth rules of 'Population.birth()'
+        to the whole herd, reduces the weight of the mothers and
+        returns the offspring.
+
+        Parameters:
+        ----------
+            rng: RandomBuffer
+
+        Returns:
+        ----------
+            Herd with the newborns.
+        """
+        p, n = self.parameters, len(self)
+        if n < 2:
+            return Herd(self.species)
+        k = p['zeta'] * (p['w_birth'] + p['sigma_birth'])
+        prob = np.minimum(1, p['gamma'] * self.fitness * (n - 1))
+        mothers = (rng.uniforms(n) < prob) & (self.weight > k)
+        weights = rng.normal(p['w_birth'], p['sigma_birth'],
+                             mothers.sum())
+        self.weight[mothers] -= p['xi'] * weights
+        self._fitness = None
+        return Herd(self.species, np.zeros(len(weights)), weights)
+
+    def will_migrate(self, rng):
+        """This method decides which animals migrate this year, each
+        with probability 'mu' times its fitness.
+
+        Parameters:
+        ----------
+            rng: RandomBuffer
+
+        Returns:
+        ----------
+            Boolean array, True for the animals that migrate.
+        """
+        return rng.uniforms(len(self)) < \
+            self.parameters['mu'] * self.fitness
+
+    def will_die(self, rng):
+        """This method decides which animals die this year: those with
+        fitness 0 and, otherwise, with probability 'omega' * (1 -
+        fitness).
+
+        Parameters:
+        ----------
+            rng: RandomBuffer
+
+        Returns:
+        ----------
+            Boolean array, True for the animals that die.
+        """
+        return (self.fitness == 0) | (
+            rng.uniforms(len(self)) <
+            self.parameters['omega'] * (1 - self.fitness))
@@ -9,18 +9,157 @@ __author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
 __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 
 import numpy as np
-from .fauna import Herbivore, Carnivore
+from .fauna import Herbivore, Carnivore, Herd
+from .rng import RandomBuffer
 
 
 class Cells:
     parameters = {}
 
-    def __init__(self):
-        """Constructor for the landscape cells."""
-        self.population = {'Herbivore': [], 'Carnivore': []}
-        self.new_population = {'Herbivore': [], 'Carnivore': []}
+    fauna_classes = {'Herbivore': Herbivore, 'Carnivore': Carnivore}
+
+    hunt_block = 64
+
+    def __init__(self, columnar=False, rng=None):
+        """Constructor for the landscape cells.
+
+        Parameters:
+        ----------
+            columnar: bool
+                If True, each species is stored as a Herd of NumPy
+                columns instead of a list of Population objects.
+
+            rng: RandomBuffer or None
+                The random number source shared by the island cells,
+                or None to create one for this cell.
+        """
+        self.columnar = columnar
+        self.rng = RandomBuffer() if rng is None else rng
+        self.population = self.empty_population()
+        self.new_population = self.empty_population()
+        self.attach_fodder(np.zeros((1, 1)), (0, 0))
         self.fodder = 0
 
+    def attach_fodder(self, fodder_grid, loc):
+        """This method makes the cell read and write its fodder in the
+        slot of the island fodder grid given by its coordinates.
+
+        Parameters:
+        ----------
+            fodder_grid: array
+                The 2D array with the fodder of all cells;
+
+            loc: tuple
+                The coordinates of the cell.
+        """
+        self._fodder_grid = fodder_grid
+        self.loc = loc
+
+    @property
+    def fodder(self):
+        """The amount of fodder available in the cell, stored in its
+        slot of the fodder grid."""
+        return self._fodder_grid[self.loc]
+
+    @fodder.setter
+    def fodder(self, fodder):
+        self._fodder_grid[self.loc] = fodder
+
+    @classmethod
+    def regrow(cls, fodder):
+        """This method returns the amount of fodder after one year of
+        growth. Passive cells do not grow fodder.
+
+        Parameters:
+        ----------
+            fodder: float or array
+                The fodder of one or many cells of this landscape.
+
+        Returns:
+        ----------
+            float or array
+        """
+        return fodder
+
+    @classmethod
+    def regrow_years(cls, fodder, years):
+        """This method returns the amount of fodder after the given
+        number of years of growth, applying the method 'regrow()' once
+        per year. Landscapes with a closed form for many years of
+        growth override it.
+
+        Parameters:
+        ----------
+            fodder: float or array
+                The fodder of one or many cells of this landscape.
+
+            years: int or array
+                The number of years of growth of each cell.
+
+        Returns:
+        ----------
+            float or array
+        """
+        fodder, years = np.array(fodder, dtype=float), np.array(years)
+        for year in range(int(years.max(initial=0))):
+            growing = years > year
+            fodder = np.where(growing, cls.regrow(fodder), fodder)
+        return fodder
+
+    def grow_fodder(self):
+        """This method applies one year of fodder growth, given by the
+        method 'regrow()' of the landscape, to the cell."""
+        self.fodder = self.regrow(self.fodder)
+
+    def feed(self):
+        """This method calls the methods 'herbivore_feed()' and
+        'carnivore_feed()', respectively, in order to execute the
+        animals eating conditions and rules."""
+        self.herbivore_feed(), self.carnivore_feed()
+
+    def grow_fodder_and_feed(self):
+        """This method increases the amount of fodder growth from the
+        previous year to now, by the method 'grow_fodder()', and then
+        calls the method 'feed()'."""
+        self.grow_fodder()
+        self.feed()
+
+    def empty_population(self):
+        """This method creates an empty population dictionary, with a
+        list per specie or, if the cell is columnar, a Herd per specie.
+
+        Returns:
+        ----------
+            Dictionary with the species on keys.
+        """
+        if self.columnar:
+            return {specie: Herd(cls)
+                    for specie, cls in self.fauna_classes.items()}
+        return {specie: [] for specie in self.fauna_classes.keys()}
+
+    @staticmethod
+    def update_fitness(animals):
+        """This method updates the outdated fitness of a list of
+        animals of the same specie with one call of 'batch_fitness()'
+        in fauna. It is called before the phases that read the
+        fitness: feeding order, birth, migration and death.
+
+        Parameters:
+        ----------
+            animals: list
+                List with, i.e., [Herbivore, Herbivore, ...].
+        """
+        animals = [animal for animal in animals
+                   if animal.fitness_outdated]
+        if len(animals) == 0:
+            return
+        specie = type(animals[0])
+        fitness = specie.batch_fitness([animal.age for animal in animals],
+                                       [animal.weight for animal in animals],
+                                       specie.parameters)
+        for animal, phi in zip(animals, fitness.tolist()):
+            animal.fitness = phi
+
     @staticmethod
     def cumsum(migrating_specie, neighbours):
         """This method generates a list with the probabilities of
@@ -42,14 +181,33 @@ class Cells:
         ----------
             List with probabilities.
         """
-        propensities = [neighbour.propensities(migrating_specie,
-                                               neighbour)
-                        for neighbour in neighbours]
+        propensities = np.array([neighbour.propensities(migrating_specie,
+                                                        neighbour)
+                                 for neighbour in neighbours])
+
+        return np.cumsum(propensities / propensities.sum())
 
-        prob = [propensity / sum(propensities)
-                for propensity in propensities]
+    def destinations(self, cum_prob, n):
+        """This method draws, at once, the destination of n migrating
+        animals of the same specie, where each animal goes to the first
+        neighbour whose cumulative probability is greater than its
+        random number.
 
-        return np.cumsum(prob)
+        Parameters:
+        ----------
+            cum_prob: array
+                The cumulative probabilities given by 'cumsum()';
+
+            n: int
+                The number of migrating animals.
+
+        Returns:
+        ----------
+            Array with the index of the neighbour of each animal.
+        """
+        destination = np.searchsorted(cum_prob, self.rng.uniforms(n),
+                                      side='right')
+        return np.minimum(destination, len(cum_prob) - 1)
 
     @staticmethod
     def propensities(migrating_specie, neighbour):
@@ -115,8 +273,8 @@ class Cells:
             Int with the relative abundance of a given specie.
         """
         f_k = neighbour.relevant_fodder(migrating_specie, neighbour)
-        n_k = len(neighbour.population[migrating_specie] +
-                  neighbour.new_population[migrating_specie])
+        n_k = len(neighbour.population[migrating_specie]) + \
+            len(neighbour.new_population[migrating_specie])
 
         if migrating_specie is 'Herbivore':
             return f_k / ((n_k + 1) * Herbivore.parameters['F'])
@@ -154,6 +312,10 @@ class Cells:
             herbivores = neighbour.population['Herbivore']
             migrated_herbivores = neighbour.new_population['Herbivore']
 
+            if neighbour.columnar:
+                return herbivores.weight.sum() + \
+                    migrated_herbivores.weight.sum()
+
             for herbivore in herbivores + migrated_herbivores:
                 f_k += herbivore.weight
 
@@ -206,32 +368,61 @@ class Cells:
 
     def herbivore_feed(self):
         """This method organizes the population of herbivores in order
-        of greatest fitness (those who eat first) to worst. Then,
-        per animal, it is applied the herbivore eating rules,
-        as following:
+        of greatest fitness (those who eat first) to worst. Then, the
+        herbivore eating rules are applied to all the herbivores at
+        once by the method 'fodder_eaten()', as following:
 
         Formula and conditions:
         ----------
             -> 'F': Animal´s appetite;
             -> 'f': Available amount of fodder.
             -> if 'F' <= 'f', then the animal eats 'F';
-            -> elif 0 < 'f' < 'F', then the animal eats 'f' - 'F';
+            -> elif 0 < 'f' < 'F', then the animal eats 'f';
             -> elif 'f' = 0, then the animal does not eat.
+
+        Only the herbivores that have eaten gain weight, so only their
+        fitness is outdated.
         """
-        self.population['Herbivore'].sort(key=lambda h: h.fitness,
-                                          reverse=True)
-        for herbivore in self.population['Herbivore']:
-            amount_eaten = 0
-            h_appetite = herbivore.parameters["F"]
-            available_fodder = self.fodder
-            if h_appetite <= available_fodder:
-                available_fodder -= h_appetite
-                amount_eaten += h_appetite
-            elif 0 < available_fodder < h_appetite:
-                available_fodder = 0
-                amount_eaten += h_appetite - available_fodder
-            herbivore.gain_weight(amount_eaten)
-            self.fodder = available_fodder
+        herbivores = self.population['Herbivore']
+        if len(herbivores) == 0:
+            return
+
+        if self.columnar:
+            herbivores.sort_by_fitness(reverse=True)
+            herbivores.gain_weight(self.fodder_eaten(len(herbivores)))
+            return
+
+        self.update_fitness(herbivores)
+        herbivores.sort(key=lambda h: h.fitness, reverse=True)
+        amount_eaten = self.fodder_eaten(len(herbivores)).tolist()
+        for herbivore, amount in zip(herbivores, amount_eaten):
+            if amount > 0:
+                herbivore.gain_weight(amount)
+
+    def fodder_eaten(self, number_herbivores):
+        """This method calculates, in one array pass, the amount of
+        fodder eaten by each herbivore of the cell, sorted by eating
+        order, and removes it from the available fodder. As every
+        herbivore asks for the same 'F', the fodder left before the
+        n-th herbivore eats is 'f' - n * 'F', so:
+
+        Formula and conditions:
+        ----------
+            amount eaten = min('F', max(0, 'f' - n * 'F'))
+
+        Parameters:
+        ----------
+            number_herbivores: int
+
+        Returns:
+        ----------
+            Array with the amount eaten by each herbivore.
+        """
+        appetite = Herbivore.parameters['F']
+        fodder_left = self.fodder - appetite * np.arange(number_herbivores)
+        amount_eaten = np.clip(fodder_left, 0, appetite)
+        self.fodder = max(0, self.fodder - amount_eaten.sum())
+        return amount_eaten
 
     def carnivore_feed(self):
         """This method organizes the population of carnivore in order
@@ -248,50 +439,146 @@ class Cells:
                with the herbivore with worst fitness, and then to the
                next herbivore until has eaten an amount 'F' of
                herbivore weight;
-            -> The probability to kill a herbivore is given by the method
-               'will_kill()';
+            -> The probability to kill a herbivore is the same of the
+               method 'will_kill()' in fauna, calculated at once for
+               all the herbivores a carnivore can reach by the method
+               'hunt()';
             -> The carnivore weight increases by the method
-               'gain_weight()' which also updates its fitness;
-            -> Every herbivore killed is removed from the population
-               by the python's built-in method '.remove()'.
+               'gain_weight()' which also outdates its fitness;
+            -> Every herbivore killed is marked and the herbivore
+               population is compacted once, after all carnivores have
+               fed.
         """
-        self.population['Carnivore'].sort(key=lambda h: h.fitness,
-                                          reverse=True)
+        carnivores = self.population['Carnivore']
+        herbivores = self.population['Herbivore']
+        if len(carnivores) == 0 or len(herbivores) == 0:
+            return
+
+        if self.columnar:
+            carnivores.sort_by_fitness(reverse=True)
+            herbivores.sort_by_fitness()
+            amount_eaten, killed = self.hunt(
+                carnivores.fitness, herbivores.fitness, herbivores.weight)
+            herbivores.keep(~killed)
+            carnivores.gain_weight(amount_eaten)
+            return
+
+        self.update_fitness(carnivores)
+        self.update_fitness(herbivores)
+        carnivores.sort(key=lambda h: h.fitness, reverse=True)
+        herbivores.sort(key=lambda h: h.fitness)
+
+        amount_eaten, killed = self.hunt(
+            np.array([carnivore.fitness for carnivore in carnivores]),
+            np.array([herbivore.fitness for herbivore in herbivores]),
+            np.array([herbivore.weight for herbivore in herbivores]))
+
+        for carnivore, amount in zip(carnivores, amount_eaten.tolist()):
+            carnivore.gain_weight(amount)
+        self.population['Herbivore'] = [
+            herbivore for herbivore, dead in zip(herbivores,
+                                                 killed.tolist())
+            if not dead]
+
+    def hunt(self, hunter_fitness, prey_fitness, prey_weight):
+        """This method carries out the hunting of a cell, where the
+        carnivores are sorted from the greatest fitness to the worst and
+        the herbivores from the worst fitness to the greatest.
 
-        self.population['Herbivore'].sort(key=lambda h: h.fitness)
-
-        for carnivore in self.population['Carnivore']:
-            appetite = carnivore.parameters['F']
-            amount_eaten = 0
-
-            for herbivore in self.population['Herbivore']:
+        Formula and conditions:
+        ----------
+            -> Each carnivore, in turn, can only kill the remaining
+               herbivores with less fitness than its own, with
+               probability min(1, ('fitness of the carnivore' -
+               'fitness of the herbivore') / 'DeltaPhiMax');
+            -> The kills of these herbivores are drawn in blocks, of
+               'hunt_block' herbivores and then twice as many each
+               time, and the carnivore keeps them, in order, until it
+               has eaten an amount 'F' of herbivore weight, so a
+               carnivore which is soon full only draws a few numbers;
+            -> The killed herbivores are only marked, so the arrays are
+               not changed while the carnivores hunt, and removed from
+               the index of the remaining herbivores once there are
+               more of them than about its square root.
 
-                if amount_eaten >= appetite:
-                    break
+        Parameters:
+        ----------
+            hunter_fitness: array
+                The fitness of the carnivores;
 
-                elif carnivore.will_kill(herbivore.fitness):
-                    food_wanted = appetite - amount_eaten
+            prey_fitness: array
+                The fitness of the herbivores;
 
-                    if herbivore.weight <= food_wanted:
-                        amount_eaten += herbivore.weight
-                        self.population['Herbivore'].remove(herbivore)
+            prey_weight: array
+                The weight of the herbivores.
 
-                    elif herbivore.weight > food_wanted:
-                        amount_eaten += food_wanted
-                        self.population['Herbivore'].remove(herbivore)
+        Returns:
+        ----------
+            Tuple with the array of the amount eaten by each carnivore
+            and the boolean array of the killed herbivores.
+        """
+        appetite = Carnivore.parameters['F']
+        d_phi_max = Carnivore.parameters['DeltaPhiMax']
+        killed = np.zeros(len(prey_fitness), dtype=bool)
+        amount_eaten = np.zeros(len(hunter_fitness))
+        alive = np.arange(len(prey_fitness))
+        marked = 0
+
+        for n, fitness in enumerate(hunter_fitness.tolist()):
+            if marked * marked > len(alive):
+                alive = alive[~killed[alive]]
+                marked = 0
+            stop = np.searchsorted(
+                alive, np.searchsorted(prey_fitness, fitness))
+            start, size = 0, self.hunt_block
+            eaten, reachable = 0.0, False
+            while start < stop:
+                block = alive[start:min(start + size, stop)]
+                block = block[~killed[block]]
+                start, size = start + size, 2 * size
+                if len(block) == 0:
+                    continue
+                reachable = True
+                p = np.minimum((fitness - prey_fitness[block]) /
+                               d_phi_max, 1)
+                kills = block[self.rng.uniforms(len(block)) < p]
+                total = eaten + np.cumsum(prey_weight[kills])
+                kills = kills[:np.searchsorted(total, appetite) + 1]
+                killed[kills] = True
+                marked += len(kills)
+                eaten += prey_weight[kills].sum()
+                if eaten >= appetite:
+                    break
+            if not reachable:
+                break
+            amount_eaten[n] = min(eaten, appetite)
 
-            carnivore.gain_weight(amount_eaten)
+        return amount_eaten, killed
 
     def add_newborns(self):
         """This method extend a specie population adding their
         offspring."""
+        if self.columnar:
+            for herd in self.population.values():
+                herd.extend(herd.give_birth(self.rng))
+            return
+
         for species in self.population.values():
+            self.update_fitness(species)
+            rnd = self.rng.uniforms(len(species)).tolist()
+            mothers = [animal for animal, u in zip(species, rnd)
+                       if animal.birth(len(species), u)]
+            if len(mothers) == 0:
+                continue
+            specie = type(mothers[0])
+            weights = self.rng.normal(specie.parameters['w_birth'],
+                                      specie.parameters['sigma_birth'],
+                                      len(mothers)).tolist()
             newborns = []
-            for animal in species:
-                if animal.birth(len(species)):
-                    newborn = type(animal)()
-                    animal.update_weight_after_birth(newborn.weight)
-                    newborns.append(newborn)
+            for mother, weight in zip(mothers, weights):
+                newborn = specie(0, weight)
+                mother.update_weight_after_birth(newborn.weight)
+                newborns.append(newborn)
             species.extend(newborns)
 
     def migrate(self, neighbours):
@@ -314,25 +601,58 @@ class Cells:
                'relevant_fodder()' and 'relative_abundance()',
                respectively;
             -> The cumulative probabilities is given by the method
-                'cumsum()';
+                'cumsum()', once per specie for the whole cell;
             -> The decision of migrating to a specifically neighbour
-               is given when the 'np.random.random()' number is equal
-               or lager then the cumulative probability.
+               is given, for all the migrating animals at once, by the
+               method 'destinations()'.
+
+        Parameters:
+        ----------
+            neighbours: list
+                List with, i.e., [Jungle, Savannah, ...].
         """
-        np.random.shuffle(neighbours)
+        self.rng.shuffle(neighbours)
+        if self.columnar:
+            self.herd_migrate(neighbours)
+            return
+
         for migrating_specie, animals in self.population.items():
-            if len(neighbours) > 0 and len(animals) > 0:
-                for animal in animals:
-                    cum_prob = self.cumsum(migrating_specie,
-                                           neighbours)
-                    if animal.will_migrate():
-                        n = 0
-                        while np.random.random() >= cum_prob[n]:
-                            n += 1
-                            n = 0 if n > 3 else n
-                        neighbours[n].new_population[migrating_specie].\
-                            append(animal)
-                        self.population[migrating_specie].remove(animal)
+            if len(neighbours) == 0 or len(animals) == 0:
+                continue
+            self.update_fitness(animals)
+            cum_prob = self.cumsum(migrating_specie, neighbours)
+            rnd = self.rng.uniforms(len(animals)).tolist()
+            staying, migrants = [], []
+            for animal, u in zip(animals, rnd):
+                if animal.will_migrate(u):
+                    migrants.append(animal)
+                else:
+                    staying.append(animal)
+            destination = self.destinations(cum_prob, len(migrants))
+            for animal, n in zip(migrants, destination.tolist()):
+                neighbours[n].new_population[migrating_specie].append(
+                    animal)
+            self.population[migrating_specie] = staying
+
+    def herd_migrate(self, neighbours):
+        """This method carries out the migration of a columnar cell.
+        As in 'migrate()', the cumulative probabilities of the
+        neighbours are calculated once per specie, and the destinations
+        of all the migrating animals are drawn at once.
+
+        Parameters:
+        ----------
+            neighbours: list
+                List with, i.e., [Jungle, Savannah, ...].
+        """
+        for migrating_specie, herd in self.population.items():
+            if len(neighbours) > 0 and len(herd) > 0:
+                cum_prob = self.cumsum(migrating_specie, neighbours)
+                migrants = herd.take(herd.will_migrate(self.rng))
+                destination = self.destinations(cum_prob, len(migrants))
+                for n, neighbour in enumerate(neighbours):
+                    neighbour.new_population[migrating_specie].extend(
+                        migrants.select(destination == n))
 
     def add_new_migrated(self):
         """This method adds the migrated animals to the population of
@@ -341,13 +661,16 @@ class Cells:
         for specie in self.population.keys():
             specie_list = self.new_population[specie]
             self.population[specie].extend(specie_list)
-            self.new_population[specie] = []
+        self.new_population = self.empty_population()
 
     def get_old(self):
         """This method identifies each specie of animals and communicates
         to the method 'get_old()' in fauna in order to apply the aging
         for each animal."""
         for specie_objects in self.population.values():
+            if self.columnar:
+                specie_objects.get_old()
+                continue
             for animal in specie_objects:
                 animal.get_old()
 
@@ -356,6 +679,9 @@ class Cells:
         to the method 'lose_weight()' in fauna in order to apply the
         weight loss for each animal."""
         for specie_objects in self.population.values():
+            if self.columnar:
+                specie_objects.lose_weight()
+                continue
             for animal in specie_objects:
                 animal.lose_weight()
 
@@ -363,9 +689,16 @@ class Cells:
         """This method determines if an animal will die according to
         the probability in the method 'will_die()' in fauna."""
         for specie_type in self.population.keys():
+            if self.columnar:
+                herd = self.population[specie_type]
+                herd.keep(~herd.will_die(self.rng))
+                continue
             survivors = []
-            for animal in self.population[specie_type]:
-                if not animal.will_die():
+            self.update_fitness(self.population[specie_type])
+            rnd = self.rng.uniforms(len(self.population[specie_type]))
+            for animal, u in zip(self.population[specie_type],
+                                 rnd.tolist()):
+                if not animal.will_die(u):
                     survivors.append(animal)
             self.population[specie_type] = survivors
 
@@ -375,16 +708,16 @@ class Jungle(Cells):
     Carnivores can prey on Herbivore in this cell."""
     parameters = {'f_max': 800.0, 'alpha': None}
 
-    def __init__(self):
+    def __init__(self, columnar=False, rng=None):
         """Constructor for the desert."""
-        super().__init__()
+        super().__init__(columnar, rng)
         self.fodder = self.parameters['f_max']
 
-    def grow_fodder_and_feed(self):
-        """This method increases the amount of fodder growth from the
-        previous year to now and then calls the methods
-        'herbivore_feed()' and 'carnivore_feed()', respectively,
-        in order to execute the animals eating conditions and rules.
+    @classmethod
+    def regrow(cls, fodder):
+        """This method returns the amount of fodder after one year of
+        growth, for one cell or, vectorized, for all the jungle cells
+        of the island fodder grid.
 
         Formula and conditions:
         ----------
@@ -398,9 +731,35 @@ class Jungle(Cells):
                         the landscape;
             -> 'f':     The remainder available amount of fodder
                         from previous year..
+
+        Parameters:
+        ----------
+            fodder: float or array
+
+        Returns:
+        ----------
+            float or array
         """
-        self.fodder = self.parameters['f_max']
-        self.herbivore_feed(), self.carnivore_feed()
+        return fodder * 0 + cls.parameters['f_max']
+
+    @classmethod
+    def regrow_years(cls, fodder, years):
+        """This method returns the amount of fodder after the given
+        number of years of growth, which is 'f_max' after one year or
+        more.
+
+        Parameters:
+        ----------
+            fodder: float or array
+
+            years: int or array
+
+        Returns:
+        ----------
+            float or array
+        """
+        return np.where(np.asarray(years) > 0, cls.parameters['f_max'],
+                        fodder)
 
 
 class Savannah(Cells):
@@ -409,16 +768,16 @@ class Savannah(Cells):
     can prey on Herbivore in this cell."""
     parameters = {'f_max': 300.0, 'alpha': 0.3}
 
-    def __init__(self):
+    def __init__(self, columnar=False, rng=None):
         """Constructor for the desert."""
-        super().__init__()
+        super().__init__(columnar, rng)
         self.fodder = self.parameters['f_max']
 
-    def grow_fodder_and_feed(self):
-        """This method increases the amount of fodder growth from the
-        previous year to now and then calls the methods
-        'herbivore_feed()' and 'carnivore_feed()', respectively,
-        in order to execute the animals eating conditions and rules.
+    @classmethod
+    def regrow(cls, fodder):
+        """This method returns the amount of fodder after one year of
+        growth, for one cell or, vectorized, for all the savannah cells
+        of the island fodder grid.
 
         Formula and conditions:
         ----------
@@ -433,12 +792,44 @@ class Savannah(Cells):
                         the landscape;
             -> 'f':     The remainder available amount of fodder
                         from previous year.
+
+        Parameters:
+        ----------
+            fodder: float or array
+
+        Returns:
+        ----------
+            float or array
         """
-        alpha = self.parameters['alpha']
-        f_max = self.parameters['f_max']
-        f = self.fodder
-        self.fodder += alpha * (f_max - f)
-        self.herbivore_feed(), self.carnivore_feed()
+        alpha = cls.parameters['alpha']
+        f_max = cls.parameters['f_max']
+        return fodder + alpha * (f_max - fodder)
+
+    @classmethod
+    def regrow_years(cls, fodder, years):
+        """This method returns, in closed form, the amount of fodder
+        after the given number of years of growth.
+
+        Formula:
+        ----------
+            -> After k years, the difference to 'f_max' shrinks by the
+               factor (1 - 'alpha') each year:
+
+        'f_k' = 'f_max' - (1 - 'alpha') ** k * ('f_max' - 'f_0')
+
+        Parameters:
+        ----------
+            fodder: float or array
+
+            years: int or array
+
+        Returns:
+        ----------
+            float or array
+        """
+        alpha = cls.parameters['alpha']
+        f_max = cls.parameters['f_max']
+        return f_max - (1 - alpha) ** np.asarray(years) * (f_max - fodder)
 
 
 class Desert(Cells):
@@ -446,16 +837,43 @@ class Desert(Cells):
     fodder available for the animal Herbivore. Although Carnivores can
     prey on Herbivore in this cell."""
 
-    def __init__(self):
+    def __init__(self, columnar=False, rng=None):
         """Constructor for the desert."""
-        super().__init__()
+        super().__init__(columnar, rng)
 
-    def grow_fodder_and_feed(self):
-        """This method increases the amount of fodder growth,
-        although, for desert landscape cells, there is no fodder
-        growth, then fodder is always equal to zero."""
-        self.fodder = 0
-        self.herbivore_feed(), self.carnivore_feed()
+    @classmethod
+    def regrow(cls, fodder):
+        """This method returns the amount of fodder after one year of
+        growth, although, for desert landscape cells, there is no
+        fodder growth, then fodder is always equal to zero.
+
+        Parameters:
+        ----------
+            fodder: float or array
+
+        Returns:
+        ----------
+            float or array
+        """
+        return fodder * 0
+
+    @classmethod
+    def regrow_years(cls, fodder, years):
+        """This method returns the amount of fodder after the given
+        number of years of growth, which is zero after one year or
+        more.
+
+        Parameters:
+        ----------
+            fodder: float or array
+
+            years: int or array
+
+        Returns:
+        ----------
+            float or array
+        """
+        return np.where(np.asarray(years) > 0, 0.0, fodder)
 
 
 class Ocean(Cells):
@@ -463,9 +881,9 @@ class Ocean(Cells):
     the landscape ocean does not receive the animals neither
     Herbivore or Carnivore."""
 
-    def __init__(self):
+    def __init__(self, columnar=False, rng=None):
         """Constructor for the ocean."""
-        super().__init__()
+        super().__init__(columnar, rng)
 
 
 class Mountain(Cells):
@@ -473,6 +891,6 @@ class Mountain(Cells):
     the landscape mountain does not receive the animals neither
     Herbivore or Carnivore."""
 
-    def __init__(self):
+    def __init__(self, columnar=False, rng=None):
         """Constructor for the mountain."""
-        super().__init__()
+        super().__init__(columnar, rng)
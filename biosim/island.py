@@ -9,8 +9,84 @@ __author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
 __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 
 import textwrap
+import collections.abc
+import numpy as np
 from .geography import Ocean, Savannah, Mountain, Jungle, Desert
 from .fauna import Herbivore, Carnivore
+from .rng import RandomBuffer
+
+
+class CellMap(dict):
+    """Dictionary of the habitable landscape cells of an island, with
+    the coordinates on keys and landscape objects on values, where a
+    cell is only created when first accessed."""
+
+    def __init__(self, create_cell):
+        """Constructor for the CellMap class.
+
+        Parameters:
+        ----------
+            create_cell: function
+                Function that creates the landscape object of the given
+                coordinates.
+        """
+        super().__init__()
+        self.create_cell = create_cell
+
+    def __missing__(self, loc):
+        """This method creates, stores and returns the landscape
+        object of coordinates not accessed before.
+
+        Parameters:
+        ----------
+            loc: tuple
+
+        Returns:
+        ----------
+            The landscape object.
+        """
+        geo_object = self.create_cell(loc)
+        self[loc] = geo_object
+        return geo_object
+
+
+class HabitableCells(collections.abc.Mapping):
+    """Read-only mapping of every habitable cell of an island, with the
+    coordinates on keys, in row-major order, and landscape objects on
+    values, taken from the CellMap of the island, so a cell is only
+    created when first accessed."""
+
+    def __init__(self, island):
+        """Constructor for the HabitableCells class.
+
+        Parameters:
+        ----------
+            island: Island
+        """
+        self.island = island
+
+    def __getitem__(self, loc):
+        """This method returns the landscape object of habitable
+        coordinates and raises a KeyError for the others.
+
+        Parameters:
+        ----------
+            loc: tuple
+
+        Returns:
+        ----------
+            The landscape object.
+        """
+        return self.island.cells[loc]
+
+    def __iter__(self):
+        """This method iterates over the coordinates of the habitable
+        cells."""
+        return map(tuple, self.island.habitable_locs.tolist())
+
+    def __len__(self):
+        """This method returns the number of habitable cells."""
+        return len(self.island.habitable_locs)
 
 
 class Island:
@@ -21,13 +97,45 @@ class Island:
     geo_classes = {'O': Ocean, 'S': Savannah, 'M': Mountain,
                    'J': Jungle, 'D': Desert}
 
-    def __init__(self, island_map):
-        """Constructor for the Island class."""
-        self.geos = self.list_geo_cells(island_map)
-        self.check_invalid_line_lengths(self.geos)
-        self.check_invalid_boundary(self.geos)
-        self.check_invalid_character(self.geos)
-        self.cells = self.create_cells()
+    landscape_codes = {'O': 0, 'M': 1, 'J': 2, 'S': 3, 'D': 4}
+
+    engines = ('objects', 'arrays')
+
+    def __init__(self, island_map, engine='objects', seed=None):
+        """Constructor for the Island class.
+
+        Parameters:
+        ----------
+            island_map: str
+
+            engine: str
+                'objects' stores every animal as a Population object,
+                'arrays' stores the animals of each cell as Herds of
+                NumPy columns.
+
+            seed: int or None
+                Seed of the random number source shared by all cells.
+        """
+        self.check_engine(engine)
+        self.engine = engine
+        self.rng = RandomBuffer(seed)
+        geos = self.list_geo_cells(island_map)
+        self.check_invalid_line_lengths(geos)
+        self.check_invalid_boundary(geos)
+        self.check_invalid_character(geos)
+        self.landscape = self.encode_landscape(geos)
+        self.landscape_masks = {
+            geo: self.landscape == self.landscape_codes[geo]
+            for geo in self.habitable_geos.keys()}
+        self.fodder = self.create_fodder_grid()
+        self.year = 0
+        self.fodder_year = np.zeros(self.landscape.shape, dtype=np.int64)
+        self.cells = CellMap(self.create_cell)
+        self.active_cells = set()
+        self._counts = np.zeros((len(self.fauna_classes),) +
+                                self.landscape.shape, dtype=np.int64)
+        self.totals = np.zeros(len(self.fauna_classes), dtype=np.int64)
+        self.build_adjacency()
 
     @staticmethod
     def check_string_instance(argument):
@@ -68,6 +176,19 @@ class Island:
             raise TypeError('Argument *{}* must be provided as '
                             'dictionary'.format(argument))
 
+    @classmethod
+    def check_engine(cls, engine):
+        """This method checks if the population storage engine given
+        by the user is known and raises a ValueError if necessary.
+
+        Parameters:
+        ----------
+            engine: str
+        """
+        if engine not in cls.engines:
+            raise ValueError('Unknown engine *{}*, must be one of '
+                             '{}'.format(engine, cls.engines))
+
     @staticmethod
     def list_geo_cells(island_map):
         """This method makes a multiline-string accessible and
@@ -93,10 +214,8 @@ class Island:
         ----------
             geos: list
         """
-        length_count = [len(row) for row in geos]
-        for i in length_count:
-            if i is not length_count[0]:
-                raise ValueError('Different line lengths detected')
+        if len({len(row) for row in geos}) > 1:
+            raise ValueError('Different line lengths detected')
 
     @staticmethod
     def check_invalid_boundary(geos):
@@ -107,14 +226,10 @@ class Island:
         ----------
             geos: list
         """
-        for north in geos[0]:
-            for south in geos[-1]:
-                if north is not 'O' or south is not 'O':
-                    raise ValueError('The boundary is not Ocean')
-        for row in geos:
-            west, east = row[0], row[-1]
-            if west is not 'O' or east is not 'O':
-                raise ValueError('The boundary is not Ocean')
+        boundary = set(geos[0]) | set(geos[-1]) | \
+            {row[0] for row in geos} | {row[-1] for row in geos}
+        if boundary != {'O'}:
+            raise ValueError('The boundary is not Ocean')
 
     @classmethod
     def check_invalid_character(cls, geos):
@@ -125,13 +240,31 @@ class Island:
         ----------
             geos: list
         """
-        for row in geos:
-            for letter in row:
-                if letter not in cls.geo_classes.keys():
-                    raise ValueError('Invalid character identified')
+        if not set().union(*geos) <= cls.geo_classes.keys():
+            raise ValueError('Invalid character identified')
 
     @classmethod
-    def check_coordinates_exists(cls, coordinates, cells):
+    def encode_landscape(cls, geos):
+        """This method converts the validated list of landscapes in a
+        compact 2D array of uint8 landscape codes.
+
+        Parameters:
+        ----------
+            geos: list
+
+        Returns:
+        ----------
+            array
+        """
+        lookup = np.zeros(256, dtype=np.uint8)
+        for geo, code in cls.landscape_codes.items():
+            lookup[ord(geo)] = code
+        letters = ''.join(''.join(row) for row in geos).encode()
+        codes = lookup[np.frombuffer(letters, dtype=np.uint8)]
+        return codes.reshape(len(geos), len(geos[0]) if geos else 0)
+
+    @staticmethod
+    def check_coordinates_exists(coordinates, landscape):
         """This method checks if the coordinates exists and raises a
         ValueError if necessary.
 
@@ -139,60 +272,117 @@ class Island:
         ----------
             coordinates: tuple
 
-            geos: list
+            landscape: array
+                The 2D array of landscape codes.
         """
-        cls.check_dict_instance(cells)
-        if coordinates not in cells.keys():
+        rows, cols = landscape.shape
+        if not (isinstance(coordinates, tuple) and len(coordinates) == 2
+                and 0 <= coordinates[0] < rows
+                and 0 <= coordinates[1] < cols):
             raise ValueError('These *{}* coordinates are not '
                              'found'.format(coordinates))
 
     @classmethod
-    def check_habitability(cls, coordinates, cells):
+    def check_habitability(cls, coordinates, landscape):
         """This method checks if the coordinates are habitable and
-        raises a ValueError if necessary.
+        raises a TypeError if necessary.
 
         Parameters:
         ----------
             coordinates: tuple
 
-            cells: dict
+            landscape: array
+                The 2D array of landscape codes.
         """
-        cls.check_dict_instance(cells)
-        if type(cells[coordinates]) not in \
-                cls.habitable_geos.values():
+        habitable_codes = [cls.landscape_codes[geo]
+                           for geo in cls.habitable_geos.keys()]
+        if landscape[coordinates] not in habitable_codes:
             raise TypeError('This *{}* area is not '
                             'habitable'.format(coordinates))
 
-    def create_cells(self):
-        """This method creates a dictionary with the coordinates on
-        keys and landscape objects on values.
+    def create_fodder_grid(self):
+        """This method creates the island fodder grid, a 2D array
+        with the fodder of every cell, where the jungle and savannah
+        cells start with their 'f_max'.
+
+        Returns:
+        ----------
+            array
+        """
+        fodder = np.zeros(self.landscape.shape)
+        for geo in ('J', 'S'):
+            mask = self.landscape_masks[geo]
+            fodder[mask] = self.geo_classes[geo].parameters['f_max']
+        return fodder
+
+    def create_cell(self, loc):
+        """This method creates the landscape object of habitable
+        coordinates, attached to its slot of the fodder grid. It is
+        called by 'cells' the first time the coordinates are accessed,
+        so only the habitable cells that are used hold any state.
+
+        Parameters:
+        ----------
+            loc: tuple
 
         Returns:
         ----------
-            dict
+            The landscape object.
         """
-        loc = [(i, j) for i in range(len(self.geos))
-               for j in range(len(self.geos[0]))]
-        geo = [self.geo_classes[geo]() for j in range(len(self.geos))
-               for geo in self.geos[j]]
-        return dict(zip(loc, geo))
+        try:
+            self.check_coordinates_exists(loc, self.landscape)
+        except ValueError:
+            raise KeyError(loc)
+        if self.cell_index[loc] < 0:
+            raise KeyError(loc)
+        code = self.landscape[loc]
+        geo = next(geo for geo, geo_code in self.landscape_codes.items()
+                   if geo_code == code)
+        geo_object = self.geo_classes[geo](self.engine == 'arrays',
+                                           self.rng)
+        geo_object.attach_fodder(self.fodder, loc)
+        return geo_object
+
+    def build_adjacency(self):
+        """This method numbers the habitable cells, in row-major
+        order, and builds, in CSR form, the index of the habitable
+        neighbours (west, north, south and east) of each habitable
+        cell, such that the neighbours of the habitable cell number i
+        are the habitable cells number
+        'neighbour_idx[neighbour_ptr[i]:neighbour_ptr[i + 1]]'. The
+        'cell_index' grid gives the number of each cell, or -1 if it is
+        not habitable, and 'habitable_flat' the flat grid index of each
+        habitable cell. It is called once at construction and must be
+        called again if the geography changes."""
+        habitable = np.zeros(self.landscape.shape, dtype=bool)
+        for mask in self.landscape_masks.values():
+            habitable |= mask
+        self.habitable_locs = np.argwhere(habitable)
+        self.cell_index = np.full(self.landscape.shape, -1, dtype=np.intp)
+        self.cell_index[habitable] = np.arange(len(self.habitable_locs))
+        self.habitable_flat = np.flatnonzero(habitable)
+
+        rows, cols = self.habitable_locs.T
+        neighbours = np.stack([self.cell_index[rows, cols - 1],
+                               self.cell_index[rows - 1, cols],
+                               self.cell_index[rows + 1, cols],
+                               self.cell_index[rows, cols + 1]], axis=1)
+        is_neighbour = neighbours >= 0
+        self.neighbour_ptr = np.concatenate(
+            ([0], np.cumsum(is_neighbour.sum(axis=1)))).astype(np.intp)
+        self.neighbour_idx = neighbours[is_neighbour]
 
     @property
     def habitable_cells(self):
-        """This method creates a dictionary with only the coordinates
-        that are habitable and store the coordinates on keys and
-        landscape objects on values.
+        """This method returns every habitable cell, with the
+        coordinates on keys and landscape objects on values. The cells
+        not accessed before are created as they are read.
 
         Returns:
         ----------
-            dict
+            HabitableCells
         """
-        coordinates, geo_objects = [], []
-        for coordinate, geo_object in self.cells.items():
-            if type(geo_object) in self.habitable_geos.values():
-                coordinates.append(coordinate)
-                geo_objects.append(geo_object)
-        return dict(zip(coordinates, geo_objects))
+        return HabitableCells(self)
 
     def set_parameters(self, param_key, params):
         """This method sets the parameter for the landscapes and animals.
@@ -205,12 +395,14 @@ class Island:
         """
         self.check_string_instance(param_key)
         self.check_dict_instance(params)
+        if param_key in self.geo_classes.keys():
+            self.catch_up_fodder()
         merged_classes = dict(**self.fauna_classes, **self.geo_classes)
         merged_classes[param_key].set_parameters(params)
 
     def add_population(self, given_pop):
         """This method creates the population objects inside the
-        cells.
+        cells and schedules the cells in the active set.
 
         Parameter:
         ----------
@@ -219,31 +411,154 @@ class Island:
         self.check_list_instance(given_pop)
         for population in given_pop:
             coordinate = population['loc']
+            self.check_coordinates_exists(coordinate, self.landscape)
+            self.check_habitability(coordinate, self.landscape)
             geo_object = self.cells[coordinate]
-            self.check_coordinates_exists(coordinate, self.cells)
-            self.check_habitability(coordinate, self.cells)
+            self.active_cells.add(coordinate)
+            if geo_object.columnar:
+                self.add_herds(geo_object, population['pop'])
+                self.update_counts(coordinate)
+                continue
             for pop_unit in population['pop']:
                 species = pop_unit['species']
                 age_weight = (pop_unit['age'], pop_unit['weight'])
                 pop_object = self.fauna_classes[species](*age_weight)
                 geo_object.population[type(pop_object).__name__].append(
                     pop_object)
+            self.update_counts(coordinate)
+
+    def add_herds(self, geo_object, pop_units):
+        """This method appends the animals given to a columnar cell,
+        gathering the ages and weights of each specie in one Herd.
+
+        Parameter:
+        ----------
+            geo_object: <class 'type'>
+                The landscape object.
+
+            pop_units: list
+                List with the animals, i.e., [{'species': 'Herbivore',
+                'age': 5, 'weight': 20}, ...].
+        """
+        for pop_unit in pop_units:
+            if pop_unit['species'] not in self.fauna_classes.keys():
+                raise ValueError('Unknown species provided: '
+                                 '*{}*'.format(pop_unit['species']))
+        for species in self.fauna_classes.keys():
+            units = [pop_unit for pop_unit in pop_units
+                     if pop_unit['species'] == species]
+            geo_object.population[species].add(
+                [unit['age'] for unit in units],
+                [unit['weight'] for unit in units])
+
+    def neighbour_locs(self, loc):
+        """This method looks up the coordinates of the habitable
+        neighbour cells (west, north, south and east) in the cached
+        neighbour index.
+
+        Parameters:
+        ----------
+            loc: tuple
+
+        Returns:
+        ----------
+            List with the coordinates of the habitable neighbours.
+        """
+        i = self.cell_index[loc]
+        if i < 0:
+            return []
+        start, stop = self.neighbour_ptr[i], self.neighbour_ptr[i + 1]
+        return [tuple(self.habitable_locs[j].tolist())
+                for j in self.neighbour_idx[start:stop].tolist()]
 
     def neighbour_cells(self, loc):
-        """This method localizes the neighbour cells (north, south,
-        west and east), checks if they are habitable and returns a
-        list with the landscape objects.
+        """This method returns a new list with the landscape objects
+        of the habitable neighbour cells (west, north, south and east).
+
+        Parameters:
+        ----------
+            loc: tuple
 
         Returns:
         ----------
             List with the habitable neighbours.
         """
-        neighbours_loc = [(loc[0], loc[1] - 1), (loc[0] - 1, loc[1]),
-                          (loc[0] + 1, loc[1]), (loc[0], loc[1] + 1)]
-        neighbours = [self.habitable_cells[coordinates] for
-                      coordinates in neighbours_loc if coordinates in
-                      self.habitable_cells.keys()]
-        return neighbours
+        return [self.cells[neighbour]
+                for neighbour in self.neighbour_locs(loc)]
+
+    @staticmethod
+    def count_animals(population):
+        """This method counts the animals of a population dictionary.
+
+        Parameters:
+        ----------
+            population: dict
+                The 'population' or 'new_population' of a cell.
+
+        Returns:
+        ----------
+            int
+        """
+        return sum(len(animals) for animals in population.values())
+
+    def active_index(self):
+        """This method returns the flat grid indices of the cells of
+        the active set and of their habitable neighbours, whose fodder
+        is read by the migration, gathered from the neighbour index
+        without touching the rest of the grid.
+
+        Returns:
+        ----------
+            Sorted array of unique flat indices.
+        """
+        if not self.active_cells:
+            return np.zeros(0, dtype=np.intp)
+        rows, cols = np.array(sorted(self.active_cells)).T
+        cells = self.cell_index[rows, cols]
+        starts = self.neighbour_ptr[cells]
+        counts = self.neighbour_ptr[cells + 1] - starts
+        offsets = np.arange(counts.sum()) - \
+            np.repeat(np.cumsum(counts) - counts, counts)
+        neighbours = self.neighbour_idx[np.repeat(starts, counts) +
+                                        offsets]
+        return self.habitable_flat[np.unique(
+            np.concatenate((cells, neighbours)))]
+
+    def catch_up_fodder(self, index=None):
+        """This method brings the fodder of the given cells up to the
+        current year, with one vectorized call of the method
+        'regrow_years()' per landscape, given the number of years
+        missed since each cell was last grown. Only the given cells
+        are read and written.
+
+        Parameters:
+        ----------
+            index: array or None
+                Flat grid indices of the habitable cells to catch up,
+                None for all.
+        """
+        if index is None:
+            index = self.habitable_flat
+        fodder = self.fodder.reshape(-1)
+        fodder_year = self.fodder_year.reshape(-1)
+        codes = self.landscape.reshape(-1)[index]
+        missed = self.year - fodder_year[index]
+        for geo, geo_class in self.habitable_geos.items():
+            selected = (codes == self.landscape_codes[geo]) & (missed > 0)
+            cells = index[selected]
+            fodder[cells] = geo_class.regrow_years(fodder[cells],
+                                                   missed[selected])
+        fodder_year[index] = self.year
+
+    def grow_fodder(self):
+        """This method starts a new year of fodder growth. Only the
+        cells of the active set and their neighbours are grown now; the
+        fodder of the idle cells is caught up, in O(1) per cell, by the
+        method 'catch_up_fodder()' when they become active again, or
+        before the landscape parameters change. Call
+        'catch_up_fodder()' to read the whole fodder grid."""
+        self.year += 1
+        self.catch_up_fodder(self.active_index())
 
     def yearly_cycle(self):
         """This method calls, in order, the methods that compound
@@ -256,17 +571,124 @@ class Island:
             5. Animal's aging;
             6. Animal's weight loss;
             7. Animal's death.
+
+        The animal phases only run on the active set, i.e., the cells
+        with animals and, after the migration, the cells receiving
+        migrants. The cells left without animals are dropped from it.
+        The population counters of each cell of the active set are
+        updated at the end of its year.
         """
-        for coord, geo_object in self.habitable_cells.items():
-            geo_object.grow_fodder_and_feed()
+        self.grow_fodder()
+        active = sorted(self.active_cells)
+        for coord in active:
+            geo_object = self.cells[coord]
+            geo_object.feed()
             geo_object.add_newborns()
             geo_object.migrate(self.neighbour_cells(coord))
 
-        for coord, geo_object in self.habitable_cells.items():
+        receiving = {neighbour for coord in active
+                     for neighbour in self.neighbour_locs(coord)
+                     if neighbour in self.cells and self.count_animals(
+                         self.cells[neighbour].new_population)}
+        self.active_cells = set()
+        for coord in sorted(receiving.union(active)):
+            geo_object = self.cells[coord]
             geo_object.add_new_migrated()
             geo_object.lose_weight()
             geo_object.get_old()
             geo_object.die()
+            self.update_counts(coord)
+            if self.count_animals(geo_object.population):
+                self.active_cells.add(coord)
+
+    def population_statistics(self):
+        """This method calculates the mean age, weight and fitness of
+        each specie over the whole island.
+
+        Returns:
+        ----------
+            Dictionary with the species on keys and dictionaries with
+            the 'age', 'weight' and 'fitness' means on values, which
+            are nan if the specie has no animals.
+        """
+        statistics = {}
+        for species in self.fauna_classes.keys():
+            columns = {'age': [], 'weight': [], 'fitness': []}
+            for coord in self.active_cells:
+                animals = self.cells[coord].population[species]
+                if self.engine == 'arrays':
+                    columns['age'].append(animals.age)
+                    columns['weight'].append(animals.weight)
+                    columns['fitness'].append(animals.fitness)
+                else:
+                    columns['age'].append([a.age for a in animals])
+                    columns['weight'].append([a.weight for a in animals])
+                    columns['fitness'].append(
+                        [a.fitness for a in animals])
+            statistics[species] = {
+                name: float(np.mean(np.concatenate(values)))
+                if sum(len(value) for value in values) else np.nan
+                for name, values in columns.items()}
+        return statistics
+
+    def update_counts(self, coord):
+        """This method updates the population counters of a cell and
+        the totals of each specie with the number of animals now in the
+        cell, which all the births, deaths, kills and migrations of the
+        cell have changed.
+
+        Parameters:
+        ----------
+            coord: tuple
+        """
+        population = self.cells[coord].population
+        for i, species in enumerate(self.fauna_classes.keys()):
+            count = len(population[species])
+            self.totals[i] += count - self._counts[(i,) + coord]
+            self._counts[(i,) + coord] = count
+
+    def population_grids(self):
+        """This method returns the population counters of the cells,
+        which are kept up to date by the yearly cycle and the method
+        'add_population()'.
+
+        Returns:
+        ----------
+            Read-only 3D array with the number of animals of the specie
+            i, in the order of 'fauna_classes', in the cell (row, col)
+            at [i, row, col]. It is a view on the counters of the
+            island.
+        """
+        counts = self._counts.view()
+        counts.flags.writeable = False
+        return counts
+
+    def species_totals(self):
+        """This method returns the running number of animals of each
+        specie on the island.
+
+        Returns:
+        ----------
+            Dictionary with the species on keys and int on values.
+        """
+        return {species: int(self.totals[i]) for i, species in
+                enumerate(self.fauna_classes.keys())}
+
+    def counts_consistent(self):
+        """This method recounts the animals of all the cells created
+        and checks them against the population counters and totals,
+        e.g., to be asserted in debug runs.
+
+        Returns:
+        ----------
+            True if the counters are right.
+        """
+        counts = np.zeros_like(self._counts)
+        for coord, geo_object in self.cells.items():
+            for i, species in enumerate(self.fauna_classes.keys()):
+                counts[(i,) + coord] = len(geo_object.population[species])
+        return bool(np.array_equal(counts, self._counts) and
+                    np.array_equal(counts.sum(axis=(1, 2)), self.totals))
 
     def get_population_numbers(self):
         """This method checks the population number of each specie, by
@@ -277,13 +699,10 @@ class Island:
         ----------
             Dictionary with the population numbers.
         """
-        population = {'Row': [], 'Col': [], 'Herbivore': [],
-                      'Carnivore': []}
-        for loc, geo_object in self.cells.items():
-            population['Row'].append(loc[0])
-            population['Col'].append(loc[1])
-            population['Herbivore'].append(
-                len(geo_object.population['Herbivore']))
-            population['Carnivore'].append(
-                len(geo_object.population['Carnivore']))
+        counts = self.population_grids()
+        rows, cols = np.indices(self.landscape.shape)
+        population = {'Row': rows.ravel().tolist(),
+                      'Col': cols.ravel().tolist()}
+        for i, species in enumerate(self.fauna_classes.keys()):
+            population[species] = counts[i].ravel().tolist()
         return population
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the statistics recorder model which functions with the BioSim
+package written for the INF200 project January 2019..
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import os
+import glob
+import numpy as np
+
+
+class StatsRecorder:
+    """Recorder appending, every given number of years, the species
+    totals, the per-cell counts and summary statistics of a simulation
+    to a columnar store on disk. The per-cell counts are kept as uint32
+    and the records are buffered in memory and written in bulk, one
+    compressed .npz chunk per 'chunk_size' records or 'chunk_bytes' of
+    counts, whichever comes first, so neither a long history nor a
+    large map has to be kept in RAM."""
+
+    species = ('Herbivore', 'Carnivore')
+    statistics = ('age', 'weight', 'fitness')
+
+    def __init__(self, directory, every=1, chunk_size=1000,
+                 chunk_bytes=64 * 2 ** 20):
+        """Constructor for the StatsRecorder class.
+
+        Parameters:
+        ----------
+            directory: str
+                Directory of the chunk files, created if necessary. It
+                must not hold the chunks of another recording, which
+                'load()' would mix with these.
+
+            every: int
+                Number of years between records.
+
+            chunk_size: int
+                Number of records per chunk file, at most.
+
+            chunk_bytes: int
+                Number of bytes of per-cell counts buffered before a
+                chunk file is written, at most one record more.
+        """
+        self.check_positive_integer(every)
+        self.check_positive_integer(chunk_size)
+        self.check_positive_integer(chunk_bytes)
+        os.makedirs(directory, exist_ok=True)
+        if self.chunk_files(directory):
+            raise ValueError('The directory *{}* already holds the '
+                             'chunks of a recording'.format(directory))
+        self.directory = directory
+        self.every = every
+        self.chunk_size = chunk_size
+        self.chunk_bytes = chunk_bytes
+        self.chunk_no = 0
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    @staticmethod
+    def check_positive_integer(argument):
+        """This method checks if the argument is a positive integer and
+        raises a ValueError if necessary.
+
+        Parameters:
+        ----------
+            argument: int
+        """
+        if not isinstance(argument, int) or argument < 1:
+            raise ValueError('*{}* is not a positive '
+                             'integer'.format(argument))
+
+    @staticmethod
+    def chunk_files(directory):
+        """This method returns the sorted names of the chunk files of a
+        directory.
+
+        Parameters:
+        ----------
+            directory: str
+
+        Returns:
+        ----------
+            list
+        """
+        return sorted(glob.glob(os.path.join(directory, 'chunk_*.npz')))
+
+    def record(self, year, grids, statistics):
+        """This method buffers the record of a year, if it is a
+        recorded year, copying the population grids as uint32, and
+        writes a chunk when the buffer is full.
+
+        Parameters:
+        ----------
+            year: int
+                The year of the record, 1 after the first simulated
+                year.
+
+            grids: dict
+                Dictionary with the 2D array of population numbers of
+                each species, as given by 'BioSim.population_grids'.
+
+            statistics: dict
+                Dictionary with the mean 'age', 'weight' and 'fitness'
+                of each species, as given by
+                'Island.population_statistics()'.
+        """
+        if year % self.every != 0:
+            return
+        counts = {species: grids[species].astype(np.uint32)
+                  for species in self.species}
+        self.buffer.append((year, counts, statistics))
+        self.buffered_bytes += sum(grid.nbytes for grid in counts.values())
+        if len(self.buffer) >= self.chunk_size or \
+                self.buffered_bytes >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        """This method writes the buffered records to a new chunk
+        file."""
+        if not self.buffer:
+            return
+        columns = {'year': np.array([year for year, _, _ in self.buffer],
+                                    dtype=np.int64)}
+        for species in self.species:
+            counts = np.stack([grids[species]
+                               for _, grids, _ in self.buffer])
+            columns[species] = counts
+            columns[species + '_total'] = counts.sum(axis=(1, 2),
+                                                     dtype=np.int64)
+            columns[species + '_cells'] = (counts > 0).sum(axis=(1, 2))
+            for name in self.statistics:
+                columns['{}_{}'.format(species, name)] = np.array(
+                    [stats[species][name] for _, _, stats in self.buffer])
+        np.savez_compressed(
+            os.path.join(self.directory,
+                         'chunk_{:05d}.npz'.format(self.chunk_no)),
+            **columns)
+        self.chunk_no += 1
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    def close(self):
+        """This method writes the records left in the buffer."""
+        self.flush()
+
+    @classmethod
+    def load(cls, directory):
+        """This method reads all the chunks of a directory and joins
+        each column over the chunks.
+
+        Parameters:
+        ----------
+            directory: str
+
+        Returns:
+        ----------
+            Dictionary with the column names on keys and arrays on
+            values, with one row per recorded year.
+        """
+        chunks = [np.load(filename)
+                  for filename in cls.chunk_files(directory)]
+        if not chunks:
+            return {}
+        return {name: np.concatenate([chunk[name] for chunk in chunks])
+                for name in chunks[0].files}
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the rendering model which functions with the BioSim package
+written for the INF200 project January 2019..
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import queue
+import traceback
+import subprocess
+import multiprocessing
+
+FFMPEG_BINARY = 'ffmpeg'
+
+
+class MovieWriter:
+    """Writer piping the raw RGBA pixels of a figure canvas, frame by
+    frame, into the standard input of a persistent ffmpeg process, so
+    no image file is written."""
+
+    def __init__(self, filename, fps=10, binary=None):
+        """Constructor for the MovieWriter class. The ffmpeg process
+        is started with the first frame, whose size it needs.
+
+        Parameters:
+        ----------
+            filename: str
+                Name of the movie file.
+
+            fps: int
+                Number of frames per second of the movie.
+
+            binary: str or None
+                Path of the ffmpeg executable, FFMPEG_BINARY if None.
+        """
+        self.filename = filename
+        self.fps = fps
+        self.binary = FFMPEG_BINARY if binary is None else binary
+        self.size = None
+        self.process = None
+
+    def command(self, width, height):
+        """This method returns the ffmpeg command reading raw RGBA
+        frames of the given size from its standard input.
+
+        Parameters:
+        ----------
+            width: int
+
+            height: int
+
+        Returns:
+        ----------
+            List with the command.
+        """
+        return [self.binary, '-y',
+                '-f', 'rawvideo',
+                '-pix_fmt', 'rgba',
+                '-s', '{}x{}'.format(width, height),
+                '-r', str(self.fps),
+                '-i', '-',
+                '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
+                '-profile:v', 'baseline',
+                '-level', '3.0',
+                '-pix_fmt', 'yuv420p',
+                self.filename]
+
+    def write_frame(self, fig):
+        """This method renders the figure canvas and writes its
+        pixels to ffmpeg.
+
+        Parameters:
+        ----------
+            fig: matplotlib.figure.Figure
+        """
+        fig.canvas.draw()
+        size = fig.canvas.get_width_height()
+        if self.process is None:
+            self.size = size
+            self.process = subprocess.Popen(
+                self.command(*size), stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elif size != self.size:
+            raise RuntimeError('The figure size changed from {} to {} '
+                               'during the movie'.format(self.size, size))
+        self.process.stdin.write(fig.canvas.buffer_rgba())
+
+    def close(self):
+        """This method closes the standard input of ffmpeg and waits
+        for it to finish the movie."""
+        if self.process is None:
+            return
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError('ffmpeg failed with the exit status '
+                               '{}'.format(self.process.returncode))
+        self.process = None
+
+
+def render_frames(frames, results, island_map, ymax_animals,
+                  cmax_animals, img_base, img_fmt, movie_fmt):
+    """This function runs in the renderer process. It draws the frames
+    taken from the queue on the figure of a viewer BioSim, which has
+    no animals and only owns the graphics and the figures written to
+    file, until it takes None. If drawing fails, the exception and its
+    traceback are sent back on the results queue and the process ends.
+
+    Parameters:
+    ----------
+        frames: multiprocessing.Queue
+            Queue with the tuples ('setup', final_year), ('frame',
+            snapshot, save), save being True if the frame is written
+            to file, and ('sync',), answered with None on the results
+            queue once the messages before it are drawn.
+
+        results: multiprocessing.Queue
+            Queue with None for each ('sync',) message and for the
+            final None, or the tuple (exception, traceback) of the
+            failure.
+
+        island_map: str
+
+        ymax_animals: int or None
+
+        cmax_animals: dict or None
+
+        img_base: str or None
+
+        img_fmt: str
+
+        movie_fmt: str or None
+    """
+    from .simulation import BioSim
+
+    try:
+        viewer = BioSim(island_map, [], None, ymax_animals, cmax_animals,
+                        img_base, img_fmt, movie_fmt=movie_fmt)
+        while True:
+            message = frames.get()
+            if message is None:
+                viewer.finish_movie()
+                results.put(None)
+                return
+            if message[0] == 'setup':
+                viewer.final_year = message[1]
+                viewer.setup_graphics()
+            elif message[0] == 'frame':
+                snapshot, save = message[1], message[2]
+                viewer.year_num = snapshot['year']
+                viewer.update_graphics(snapshot)
+                if save:
+                    viewer.save_figures()
+            else:
+                results.put(None)
+    except Exception as error:
+        results.put((error, traceback.format_exc()))
+
+
+class AsyncRenderer:
+    """Renderer running the graphics of a simulation in a separate
+    process, fed by a bounded queue of per-year snapshots, such that
+    the frames which are only shown are dropped when the renderer falls
+    behind, while the frames written to file are always rendered. The
+    queues are only waited on for 'poll' seconds at a time, checking in
+    between that the renderer process is alive, and an exception of
+    the renderer is raised again in the simulation."""
+
+    poll = 0.1
+
+    def __init__(self, island_map, ymax_animals=None, cmax_animals=None,
+                 img_base=None, img_fmt='png', movie_fmt=None,
+                 max_frames=4):
+        """Constructor for the AsyncRenderer class, which starts the
+        renderer process.
+
+        Parameters:
+        ----------
+            island_map: str
+
+            ymax_animals: int or None
+
+            cmax_animals: dict or None
+
+            img_base: str or None
+
+            img_fmt: str
+
+            movie_fmt: str or None
+                As given to BioSim.
+
+            max_frames: int
+                Number of frames waiting in the queue, at most.
+        """
+        context = multiprocessing.get_context('spawn')
+        self.frames = context.Queue(max_frames)
+        self.results = context.Queue()
+        self.dropped = 0
+        self.failed = False
+        self.process = context.Process(
+            target=render_frames, daemon=True,
+            args=(self.frames, self.results, island_map, ymax_animals,
+                  cmax_animals, img_base, img_fmt, movie_fmt))
+        self.process.start()
+
+    def raise_error(self, result):
+        """This method raises again the exception of the renderer
+        process, caused by its traceback in that process.
+
+        Parameters:
+        ----------
+            result: tuple
+                The exception and its traceback, as str.
+        """
+        self.failed = True
+        error, trace = result
+        raise error from RuntimeError(
+            'Traceback of the renderer process:\n' + trace)
+
+    def check(self):
+        """This method raises the exception of the renderer process, or
+        a RuntimeError, if the process is not alive."""
+        if self.process.is_alive():
+            return
+        try:
+            result = self.results.get(timeout=1)
+        except queue.Empty:
+            result = None
+        if result is not None:
+            self.raise_error(result)
+        self.failed = True
+        raise RuntimeError('The renderer process ended with the exit '
+                           'code {}'.format(self.process.exitcode))
+
+    def put(self, message):
+        """This method puts a message in the queue, waiting while the
+        queue is full and the renderer process is alive.
+
+        Parameters:
+        ----------
+            message: tuple or None
+        """
+        while True:
+            self.check()
+            try:
+                self.frames.put(message, timeout=self.poll)
+                return
+            except queue.Full:
+                pass
+
+    def receive(self):
+        """This method waits, while the renderer process is alive, for
+        the answer to a ('sync',) or None message."""
+        while True:
+            try:
+                result = self.results.get(timeout=self.poll)
+            except queue.Empty:
+                self.check()
+                continue
+            if result is not None:
+                self.raise_error(result)
+            return
+
+    def setup(self, final_year):
+        """This method asks the renderer to setup the graphics up to the
+        final year.
+
+        Parameters:
+        ----------
+            final_year: int
+        """
+        self.put(('setup', final_year))
+
+    def submit(self, snapshot, save=False):
+        """This method sends a snapshot to the renderer. It is dropped
+        if the queue is full, unless it is written to file.
+
+        Parameters:
+        ----------
+            snapshot: dict
+                Dictionary with the 'year' and the population grid of
+                each species.
+
+            save: bool
+                True if the frame is written to file.
+
+        Returns:
+        ----------
+            True if the snapshot was sent, False if it was dropped.
+        """
+        message = ('frame', snapshot, save)
+        if save:
+            self.put(message)
+            return True
+        self.check()
+        try:
+            self.frames.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def wait(self):
+        """This method waits until the renderer has drawn all the
+        snapshots sent."""
+        self.put(('sync',))
+        self.receive()
+
+    def close(self):
+        """This method waits for the renderer, which finishes the
+        movie if any, and stops its process. A renderer whose failure
+        was already raised is only stopped."""
+        try:
+            if not self.failed:
+                self.put(None)
+                self.receive()
+        finally:
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the random number model which functions with the BioSim package
+written for the INF200 project January 2019..
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import numpy as np
+
+
+class RandomBuffer:
+    """Random number source owned by a simulation. It wraps a
+    numpy.random.Generator and serves uniform numbers from large
+    pre-generated blocks, so the yearly phases can consume them in bulk
+    without touching the global numpy random state."""
+
+    def __init__(self, seed=None, block_size=65536):
+        """Constructor for the RandomBuffer class.
+
+        Parameters:
+        ----------
+            seed: int or None
+                Seed of the generator, None for a random seed;
+
+            block_size: int
+                Number of uniform numbers generated at once.
+        """
+        self.check_block_size(block_size)
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        self._block = np.zeros(0)
+        self._next = 0
+
+    @staticmethod
+    def check_block_size(block_size):
+        """This method checks if the block size is a positive integer
+        and raises a ValueError if necessary.
+
+        Parameters:
+        ----------
+            block_size: int
+        """
+        if not isinstance(block_size, int) or block_size < 1:
+            raise ValueError('The block size must be a positive '
+                             'integer')
+
+    def refill(self):
+        """This method generates a new block of uniform numbers."""
+        self._block = self.generator.random(self.block_size)
+        self._next = 0
+
+    def random(self):
+        """This method returns one uniform number in [0, 1).
+
+        Returns:
+        ----------
+            float
+        """
+        if self._next >= len(self._block):
+            self.refill()
+        self._next += 1
+        return float(self._block[self._next - 1])
+
+    def uniforms(self, n):
+        """This method returns n uniform numbers in [0, 1) taken from
+        the pre-generated blocks.
+
+        Parameters:
+        ----------
+            n: int
+
+        Returns:
+        ----------
+            Array with the numbers.
+        """
+        left = len(self._block) - self._next
+        if n <= left:
+            self._next += n
+            return self._block[self._next - n:self._next]
+        head = self._block[self._next:]
+        if n - left > self.block_size:
+            self._next = len(self._block)
+            return np.concatenate((head,
+                                   self.generator.random(n - left)))
+        self.refill()
+        self._next = n - left
+        return np.concatenate((head, self._block[:self._next]))
+
+    def normal(self, loc, scale, size=None):
+        """This method draws numbers from a normal distribution.
+
+        Parameters:
+        ----------
+            loc: float
+
+            scale: float
+
+            size: int or None
+
+        Returns:
+        ----------
+            float if size is None, else array.
+        """
+        return self.generator.normal(loc, scale, size)
+
+    def shuffle(self, sequence):
+        """This method shuffles a list or array in place.
+
+        Parameters:
+        ----------
+            sequence: list or array
+        """
+        self.generator.shuffle(sequence)
@@ -10,30 +10,34 @@ __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 
 import textwrap
 import subprocess
-import pandas as pd
+import collections
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 from .island import Island
-import matplotlib.colors as mcolors
-import matplotlib.patches as mpatches
 
-matplotlib.use('macosx')
+from .rendering import FFMPEG_BINARY
 
-FFMPEG_BINARY = 'ffmpeg'
 DEFAULT_MOVIE_FORMAT = 'mp4'
 
+YearState = collections.namedtuple('YearState', ['year', 'counts', 'grids'])
+YearState.__doc__ = """State of the island at the end of a simulated
+year, yielded by 'BioSim.run()': the number of years simulated so far,
+a dictionary with the total of each species and, if asked, a dictionary
+with the read-only (rows, cols) population grid of each species, which
+is a view valid until the next year."""
+
 
 class BioSim:
     """Responsible to provide to the user an interface for simulation as
-    well as visualization."""
+    well as visualization. Pandas and matplotlib are only imported by
+    the methods that use them, so a headless simulation never loads
+    them."""
 
     map_colors = {
-        "O": mcolors.to_rgba("navy"),
-        "J": mcolors.to_rgba("forestgreen"),
-        "S": mcolors.to_rgba("#e1ab62"),
-        "D": mcolors.to_rgba("salmon"),
-        "M": mcolors.to_rgba("lightslategrey"),
+        "O": "navy",
+        "J": "forestgreen",
+        "S": "#e1ab62",
+        "D": "salmon",
+        "M": "lightslategrey",
     }
     map_labels = {
         "O": "Ocean",
@@ -50,7 +54,10 @@ class BioSim:
                  ymax_animals=None,
                  cmax_animals=None,
                  img_base=None,
-                 img_fmt='png'):
+                 img_fmt='png',
+                 engine='objects',
+                 render_async=False,
+                 movie_fmt=None):
         """
         BioSims package constructor.
 
@@ -79,6 +86,21 @@ class BioSim:
         img_fmt:
             String with file type for figures, e.g. ’png’.
 
+        engine:
+            String with the population storage engine, 'objects' for
+            one Python object per animal or 'arrays' for NumPy columns
+            per cell and species.
+
+        render_async:
+            Bool, True to draw the graphics in a separate process fed
+            by a bounded queue of snapshots, dropping the frames that
+            are only shown when the renderer falls behind.
+
+        movie_fmt:
+            String with the movie file type, e.g. 'mp4', to pipe the
+            figures straight into ffmpeg instead of writing image files,
+            or None to write one img_fmt file per figure.
+
         Notes
         ----------
             -> If ymax_animals is None, the y-axis limit should be
@@ -98,9 +120,8 @@ class BioSim:
                name.
         """
         self._map = island_map
-        self.island = Island(self._map)
+        self.island = Island(self._map, engine, seed)
         self.island.add_population(ini_pop)
-        np.random.seed(seed)
         self.last_year = 0
         self.year_num = 0
         self.img_no = 0
@@ -116,6 +137,17 @@ class BioSim:
         self.carn_pop = None
         self._herb_img_axis = None
         self._carn_img_axis = None
+        self._year_text = None
+        self._line_years = None
+        self._line_counts = None
+        self._background = None
+        self._map_array = None
+        self.render_async = render_async
+        self.renderer = None
+        self.movie_fmt = movie_fmt
+        self.movie = None
+        self.recorder = None
+        self.stop_reason = None
 
         if img_base is None:
             self.img_base = None
@@ -130,12 +162,18 @@ class BioSim:
 
     @property
     def generate_map_array(self):
-        """This method generates the colored island map array.
+        """This method generates the colored island map array, once,
+        and caches it.
 
         Returns
         ----------
             Array with the map colors.
         """
+        import matplotlib.colors as mcolors
+
+        if self._map_array is not None:
+            return self._map_array
+
         lines = textwrap.dedent(self._map).splitlines()
         if len(lines[-1]) is 0:
             lines = lines[:-1]
@@ -152,7 +190,9 @@ class BioSim:
                     raise ValueError(
                         f"'{letter}' is not a valid landscape type. "
                         f"Must be one of {set(self.map_colors.keys())}")
-                map_array[-1].append(self.map_colors[letter])
+                map_array[-1].append(
+                    mcolors.to_rgba(self.map_colors[letter]))
+        self._map_array = map_array
         return map_array
 
     @property
@@ -163,8 +203,7 @@ class BioSim:
         ----------
             Int with the total number of population in the Island.
         """
-        pop = self.island.get_population_numbers()
-        return sum(pop['Herbivore']) + sum(pop['Carnivore'])
+        return int(self.island.totals.sum())
 
     @property
     def year(self):
@@ -185,9 +224,34 @@ class BioSim:
             -> Dictionary with the species as keys and number of each
                population as values.
         """
-        pop = self.island.get_population_numbers()
-        return {'Herbivore': sum(pop['Herbivore']),
-                'Carnivore': sum(pop['Carnivore'])}
+        return self.island.species_totals()
+
+    @property
+    def population_grids(self):
+        """Number of animals per species in each cell, as 2D arrays.
+
+        Returns
+        ----------
+            -> Dictionary with the species as keys and read-only
+               (rows, cols) int arrays as values. The arrays are live
+               views on the population counters of the island, which
+               change every simulated year; copy them to keep the
+               numbers of a year.
+        """
+        counts = self.island.population_grids()
+        return {species: counts[i] for i, species in
+                enumerate(self.island.fauna_classes.keys())}
+
+    @property
+    def total_population_grid(self):
+        """Number of animals of all species in each cell, as a 2D
+        array.
+
+        Returns
+        ----------
+            (rows, cols) int array.
+        """
+        return self.island.population_grids().sum(axis=0)
 
     @property
     def animal_distribution(self):
@@ -198,7 +262,12 @@ class BioSim:
         ----------
             Pandas DataFrame with the simulated data.
         """
-        data = self.island.get_population_numbers()
+        import pandas as pd
+
+        rows, cols = np.indices(self.island.landscape.shape)
+        data = {'Row': rows.ravel(), 'Col': cols.ravel()}
+        for species, grid in self.population_grids.items():
+            data[species] = grid.ravel()
         return pd.DataFrame(data, columns=['Row',
                                            'Carnivore',
                                            'Col',
@@ -243,46 +312,227 @@ class BioSim:
         """
         self.island.add_population(population)
 
-    def simulate(self, num_years, vis_years=1, img_years=None):
+    def simulate(self, num_years, vis_years=1, img_years=None,
+                 stop_when=None):
         """This method is the simulation procedures.
 
         Parameters
         ----------
         num_years: int
 
-        vis_years: int
+        vis_years: int or None
+            Number of years between visualization updates, None for a
+            headless simulation.
+
+        img_years: int or None
+            Number of years between the figures written to file, equal
+            to vis_years if None.
 
-        img_years: int
+        stop_when: list or None
+            Termination criteria, see the method 'run()'.
 
+        Notes
+        ----------
+            -> The simulation is headless, i.e., it runs only the model
+               and never touches matplotlib, if vis_years is None and
+               no figures are written to file, that is, img_years or
+               img_base is None.
         """
         if img_years is None:
             img_years = vis_years
+        if self.img_base is None:
+            img_years = None
 
-        self.last_year += num_years
         self.final_year = self.year_num + num_years
-        self.setup_graphics(), self.update_graphics()
+        headless = vis_years is None and img_years is None
+        if not headless and self.render_async:
+            self.start_renderer()
+            self.renderer.setup(self.final_year)
+            self.renderer.submit(self.snapshot())
+        elif not headless:
+            self.setup_graphics(), self.update_graphics()
+
+        for _ in self.run(num_years, stop_when=stop_when):
+            visualize = vis_years is not None and \
+                self.year_num % vis_years == 0
+            save = img_years is not None and \
+                self.year_num % img_years == 0
+            if (visualize or save) and self.render_async:
+                self.renderer.submit(self.snapshot(), save)
+            elif visualize or save:
+                self.update_graphics()
+
+            if save and not self.render_async:
+                self.save_figures()
+
+        if self.renderer is not None:
+            self.renderer.wait()
+
+    def run(self, num_years, grids=False, stop_when=None):
+        """This method simulates the given number of years, headless,
+        yielding the state of the island at the end of each year. The
+        consumer can stop early, in which case only the years yielded
+        are counted as simulated.
+
+        Parameters
+        ----------
+        num_years: int
 
-        while self.year_num < self.final_year:
+        grids: bool
+            True to include the population grids in the states.
+
+        stop_when: list or None
+            Termination criteria from 'biosim.termination', e.g.,
+            [Extinction('Carnivore'), WallClockBudget(60)]. The
+            simulation stops after the first year one of them is met,
+            and 'stop_reason' tells why.
+
+        Yields
+        ----------
+            YearState of each year.
+        """
+        criteria = [] if stop_when is None else list(stop_when)
+        for criterion in criteria:
+            criterion.start()
+        self.stop_reason = None
+        for _ in range(num_years):
             self.island.yearly_cycle()
+            self.last_year += 1
+            if self.recorder is not None and \
+                    self.last_year % self.recorder.every == 0:
+                self.recorder.record(
+                    self.last_year, self.population_grids,
+                    self.island.population_statistics())
+            state = YearState(
+                self.last_year, self.island.species_totals(),
+                self.population_grids if grids else None)
+            try:
+                yield state
+            finally:
+                self.year_num += 1
+            for criterion in criteria:
+                self.stop_reason = criterion.check(state)
+                if self.stop_reason is not None:
+                    return
+
+    def record_statistics(self, directory, every=1, chunk_size=1000,
+                          chunk_bytes=64 * 2 ** 20):
+        """This method starts recording, every given number of years of
+        the next simulations, the species totals, the per-cell counts
+        and the mean age, weight and fitness of each species, in chunk
+        files of a directory, which are read by
+        'StatsRecorder.load(directory)'. A record is labelled with the
+        year of its 'YearState', e.g., 1 for the state after the first
+        simulated year. A chunk is written when it is full and the
+        records left by the method 'stop_recording()'.
 
-            if self.year_num % vis_years is 0:
-                self.update_graphics()
+        Parameters
+        ----------
+        directory: str
+            Directory holding no chunk files.
 
-            if self.year_num % img_years is 0:
-                self.save_figures()
+        every: int
+            Number of years between records.
+
+        chunk_size: int
+            Number of records per chunk file, at most.
+
+        chunk_bytes: int
+            Number of bytes of per-cell counts kept in memory before a
+            chunk file is written.
+        """
+        from .recorder import StatsRecorder
+
+        self.stop_recording()
+        self.recorder = StatsRecorder(directory, every, chunk_size,
+                                      chunk_bytes)
+
+    def stop_recording(self):
+        """This method writes the records left and stops recording."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
-            self.year_num += 1
+    def snapshot(self):
+        """This method takes a lightweight snapshot of the current
+        year, to be drawn by the method 'update_graphics()'.
+
+        Returns
+        ----------
+            Dictionary with the 'year' and the 2D array with the
+            population numbers of each species.
+        """
+        snapshot = {'year': self.year_num}
+        for species, grid in self.population_grids.items():
+            snapshot[species] = grid.copy()
+        return snapshot
+
+    def start_renderer(self):
+        """This method starts the renderer process, if it is not
+        running, replacing a renderer which failed."""
+        from .rendering import AsyncRenderer
+
+        if self.renderer is not None and self.renderer.failed:
+            self.close_renderer()
+        if self.renderer is None:
+            self.renderer = AsyncRenderer(
+                self._map, self.ymax_animals, self.cmax_animals,
+                self.img_base, self.img_fmt, self.movie_fmt)
+
+    def close_renderer(self):
+        """This method waits for the renderer process to draw the
+        snapshots sent and to finish the movie, if any, and stops
+        it."""
+        if self.renderer is not None:
+            try:
+                self.renderer.close()
+            finally:
+                self.renderer = None
+
+    def image_filename(self):
+        """This method returns the file name of the next figure and
+        increases the image number.
+
+        Returns
+        ----------
+            str
+        """
+        filename = '{}_{:05d}.{}'.format(self.img_base, self.img_no,
+                                         self.img_fmt)
+        self.img_no += 1
+        return filename
 
     def save_figures(self):
         """This method saves the simulated graphic figures on a
         given image base."""
         if self.img_base is None:
-            pass
-        else:
-            plt.savefig('{}_{:05d}.{}'.format(self.img_base,
-                                              self.img_no,
-                                              self.img_fmt))
-            self.img_no += 1
+            return
+        self.set_animated(False)
+        try:
+            if self.movie_fmt is not None:
+                self.write_movie_frame()
+            else:
+                self.fig.savefig(self.image_filename())
+        finally:
+            self.set_animated(True)
+
+    def write_movie_frame(self):
+        """This method pipes the figure into the ffmpeg process of the
+        movie, starting it with the first frame."""
+        from .rendering import MovieWriter
+
+        if self.movie is None:
+            self.movie = MovieWriter('{}.{}'.format(self.img_base,
+                                                    self.movie_fmt))
+        self.movie.write_frame(self.fig)
+        self.img_no += 1
+
+    def finish_movie(self):
+        """This method closes the ffmpeg process, which writes the
+        movie file."""
+        if self.movie is not None:
+            self.movie.close()
+            self.movie = None
 
     def create_mp4(self, mov_fmt=DEFAULT_MOVIE_FORMAT):
         """
@@ -297,6 +547,11 @@ class BioSim:
         if self.img_base is None:
             raise RuntimeError("No Image base defined.")
 
+        if self.movie_fmt is not None:
+            self.close_renderer()
+            self.finish_movie()
+            return
+
         if mov_fmt is 'mp4':
             try:
                 subprocess.check_call([FFMPEG_BINARY,
@@ -313,10 +568,18 @@ class BioSim:
                 raise RuntimeError('ffmpeg failed: {}'.format(err))
 
     def setup_graphics(self):
-        """This method setups the graphics of the visualization."""
+        """This method setups the graphics of the visualization. The
+        static map, the axes and the artists are created once, and the
+        line buffers are extended to the final year, such that each
+        frame only updates the data of the artists."""
+        import matplotlib.pyplot as plt
+
         if self.fig is None:
             self.fig = plt.figure(figsize=[12, 7])
-            self.fig.canvas.set_window_title('BioSim Window')
+            if self.fig.canvas.manager is not None:
+                self.fig.canvas.manager.set_window_title('BioSim Window')
+            self.fig.canvas.mpl_connect('resize_event',
+                                        self.reset_background)
 
         if self._island_map is None:
             self.static_map()
@@ -326,51 +589,83 @@ class BioSim:
             self._mean_ax.set_ylim(0, 20000)
 
         self._mean_ax.set_xlim(0, self.final_year)
-        self.herbivore_line()
-        self.carnivore_line()
+        self.population_lines()
 
         if self.herb_pop is None:
             self.herb_pop = self.fig.add_subplot(2, 2, 3)
-            self._herb_img_axis = None
+            self._herb_img_axis = self.population_image(
+                self.herb_pop, 'Herbivore distribution')
 
         if self.carn_pop is None:
             self.carn_pop = self.fig.add_subplot(2, 2, 4)
-            self._carn_img_axis = None
+            self._carn_img_axis = self.population_image(
+                self.carn_pop, 'Carnivore distribution')
+
+        if self._year_text is None:
+            self._year_text = self.fig.suptitle('', x=0.025, fontsize=10)
 
+        self.set_animated(True)
         self.fig.tight_layout()
+        self.reset_background()
+
+    def population_lines(self):
+        """This method creates the herbivore and carnivore lines on the
+        graphic, with preallocated buffers, and extends the buffers
+        when a simulation goes beyond them."""
+        capacity = 0 if self._line_counts is None \
+            else self._line_counts.shape[1]
+        if self.final_year > capacity:
+            counts = np.full((2, max(self.final_year, 2 * capacity)),
+                             np.nan)
+            if capacity > 0:
+                counts[:, :capacity] = self._line_counts
+            self._line_counts = counts
+            self._line_years = np.arange(counts.shape[1])
 
-    def herbivore_line(self):
-        """This method creates the herbivore line on the graphic."""
         if self._herbivore_line is None:
-            plot = self._mean_ax.plot(
-                np.arange(0, self.final_year),
-                np.nan * np.ones(self.final_year))
-            self._herbivore_line = plot[0]
-        else:
-            xdata, ydata = self._herbivore_line.get_data()
-            xnew = np.arange(xdata[-1] + 1, self.final_year)
-            if len(xnew) > 0:
-                ynew = np.nan * np.ones_like(xnew)
-                self._herbivore_line.set_data(np.hstack((xdata, xnew)),
-                                              np.hstack((ydata, ynew)))
-
-    def carnivore_line(self):
-        """This method creates the carnivore line on the graphic."""
-        if self._carnivore_line is None:
-            carnivore_plot = self._mean_ax.plot(
-                np.arange(0, self.final_year),
-                np.nan * np.ones(self.final_year))
-            self._carnivore_line = carnivore_plot[0]
-        else:
-            xdata, ydata = self._carnivore_line.get_data()
-            xnew = np.arange(xdata[-1] + 1, self.final_year)
-            if len(xnew) > 0:
-                ynew = np.nan * np.ones_like(xnew)
-                self._carnivore_line.set_data(np.hstack((xdata, xnew)),
-                                              np.hstack((ydata, ynew)))
+            self._herbivore_line = self._mean_ax.plot(
+                self._line_years, self._line_counts[0])[0]
+            self._carnivore_line = self._mean_ax.plot(
+                self._line_years, self._line_counts[1])[0]
+        elif self.final_year > capacity:
+            self._herbivore_line.set_data(self._line_years,
+                                          self._line_counts[0])
+            self._carnivore_line.set_data(self._line_years,
+                                          self._line_counts[1])
+
+    def population_image(self, axis, title):
+        """This method creates the heat map of a species population,
+        with its colorbar, ticks and title.
+
+        Parameters
+        ----------
+        axis: matplotlib.axes.Axes
+
+        title: str
+
+        Returns
+        ----------
+            The image artist.
+        """
+        import matplotlib.pyplot as plt
+
+        rows = len(self.generate_map_array)
+        cols = len(self.generate_map_array[0])
+        image = axis.imshow(np.zeros((rows, cols)), vmin=0, vmax=200,
+                            interpolation='nearest', aspect='auto',
+                            cmap="Spectral")
+        plt.colorbar(image, ax=axis)
+        axis.set_xticks(range(0, cols, 5))
+        axis.set_xticklabels(range(1, 1 + cols, 5))
+        axis.set_yticks(range(0, rows, 5))
+        axis.set_yticklabels(range(1, 1 + rows, 5))
+        axis.set_title(title)
+        return image
 
     def static_map(self):
         """This method creates the static map on the visualization."""
+        import matplotlib.patches as mpatches
+
         self._island_map = self.fig.add_subplot(2, 2, 1)
         self._island_map.imshow(self.generate_map_array)
         patches = []
@@ -386,74 +681,89 @@ class BioSim:
         and carnivore."""
         herb_count, carn_count = list(pop_count.values())
 
-        herb = self._herbivore_line.get_ydata()
-        herb[self.year_num] = herb_count
-        self._herbivore_line.set_ydata(herb)
-
-        carn = self._carnivore_line.get_ydata()
-        carn[self.year_num] = carn_count
-        self._carnivore_line.set_ydata(carn)
+        self._line_counts[:, self.year_num] = herb_count, carn_count
+        self._herbivore_line.set_ydata(self._line_counts[0])
+        self._carnivore_line.set_ydata(self._line_counts[1])
 
     def update_herb(self, pop):
         """This method updates the herbivore population on the
         graphic."""
-        if self._herb_img_axis is not None:
-            self._herb_img_axis.set_data(pop)
-        else:
-            self._herb_img_axis = self.herb_pop.imshow(
-                pop, vmin=0,
-                vmax=200,
-                interpolation='nearest',
-                aspect='auto',
-                cmap="Spectral")
-            plt.colorbar(self._herb_img_axis, ax=self.herb_pop)
-            self.herb_pop.set_xticks(
-                range(0, len(self.generate_map_array[0]), 5))
-            self.herb_pop.set_xticklabels(range(1, 1 + len(
-                self.generate_map_array[0]), 5))
-
-            self.herb_pop.set_yticks(
-                range(0, len(self.generate_map_array), 5))
-            self.herb_pop.set_yticklabels(range(1, 1 + len(
-                self.generate_map_array), 5))
-            self.herb_pop.set_title('Herbivore distribution')
+        self._herb_img_axis.set_data(pop)
 
     def update_carn(self, distribution):
         """This method updates the Carnivore population on the
         graphic."""
-        if self._carn_img_axis is not None:
-            self._carn_img_axis.set_data(distribution)
+        self._carn_img_axis.set_data(distribution)
+
+    def animated_artists(self):
+        """This method returns the artists that change every frame.
+
+        Returns
+        ----------
+            List with the artists.
+        """
+        return [self._herbivore_line, self._carnivore_line,
+                self._herb_img_axis, self._carn_img_axis,
+                self._year_text]
 
+    def set_animated(self, animated):
+        """This method sets if the artists that change every frame are
+        left out of the full draws of the figure, which is needed for
+        blitting, or drawn with it, which is needed to save it.
+
+        Parameters
+        ----------
+        animated: bool
+        """
+        for artist in self.animated_artists():
+            artist.set_animated(animated)
+
+    def reset_background(self, event=None):
+        """This method discards the cached background of the figure,
+        such that the next frame draws the whole figure again.
+
+        Parameters
+        ----------
+        event: matplotlib.backend_bases.Event or None
+        """
+        self._background = None
+
+    def draw_frame(self):
+        """This method draws a frame by blitting: the cached background
+        of the figure is restored and only the artists that change
+        every frame are drawn on it. The background is drawn and cached
+        with the first frame."""
+        import matplotlib.pyplot as plt
+
+        canvas = self.fig.canvas
+        if self._background is None:
+            plt.show(block=False)
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
         else:
-            self._carn_img_axis = self.carn_pop.imshow(
-                distribution, vmin=0, vmax=200, interpolation='nearest',
-                aspect='auto', cmap="Spectral")
-
-            plt.colorbar(self._carn_img_axis, ax=self.carn_pop)
-            self.carn_pop.set_xticks(range(0,
-                                           len(self.generate_map_array[
-                                                   0]), 5))
-            self.carn_pop.set_xticklabels(range(1, 1 + len(
-                self.generate_map_array[0]), 5))
-
-            self.carn_pop.set_yticks(
-                range(0, len(self.generate_map_array), 5))
-
-            self.carn_pop.set_yticklabels(range(1, 1 + len(
-                self.generate_map_array), 5))
-
-            self.carn_pop.set_title('Carnivore distribution')
-
-    def update_graphics(self):
-        """This method updates the graphics with the simulated data
-        provided by the Pandas DataFrame."""
-        counter = self.animal_distribution
-        row = len(self.generate_map_array)
-        col = len(self.generate_map_array[0])
-
-        self.update_counter_graph(self.num_animals_per_species)
-        self.update_herb(np.array(counter.Herbivore).reshape(row, col))
-        self.update_carn(np.array(counter.Carnivore).reshape(row, col))
-        plt.pause(1e-6)
-        self.fig.suptitle('Year: {}'.format(self.year_num),
-                          x=0.025, fontsize=10)
+            canvas.restore_region(self._background)
+        for artist in self.animated_artists():
+            self.fig.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def update_graphics(self, snapshot=None):
+        """This method updates the graphics with a snapshot of the
+        simulated data.
+
+        Parameters
+        ----------
+        snapshot: dict or None
+            Snapshot given by the method 'snapshot()', None for the
+            current year.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+
+        self.update_counter_graph(
+            {species: int(snapshot[species].sum())
+             for species in ('Herbivore', 'Carnivore')})
+        self.update_herb(snapshot['Herbivore'])
+        self.update_carn(snapshot['Carnivore'])
+        self._year_text.set_text('Year: {}'.format(self.year_num))
+        self.draw_frame()
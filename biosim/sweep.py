@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the parameter sweep model which functions with the BioSim
+package written for the INF200 project January 2019..
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import os
+import json
+import hashlib
+import itertools
+import multiprocessing
+import numpy as np
+from .ensemble import run_scenario, current_parameters, \
+    apply_parameters
+
+
+def run_point(task):
+    """This function runs, in a worker process, the scenario of one
+    point of the sweep with one seed. The parameters of the point hold
+    every parameter of the species and landscapes, so they replace
+    those left by the previous point of the worker.
+
+    Parameters:
+    ----------
+        task: tuple
+            The cache key, the map, the initial population, the
+            parameters, the engine, the seed and the number of years.
+
+    Returns:
+    ----------
+        The cache key and the 2D array with the species totals of each
+        year.
+    """
+    key, island_map, ini_pop, params, engine, seed, num_years = task
+    apply_parameters(params)
+    return key, run_scenario(island_map, ini_pop, engine, seed,
+                             num_years)
+
+
+class ParameterSweep:
+    """Runner of a scenario over a grid of species and landscape
+    parameters and many seeds, in a pool of worker processes. Each
+    point of the grid is merged into the parameters the species and
+    landscapes have when the sweep is run. The species totals of
+    each run are stored in an on-disk cache keyed by a hash of the map,
+    the initial population, the merged parameters, the engine, the seed
+    and the number of years, so only the runs missing from the cache
+    are computed."""
+
+    def __init__(self, island_map, ini_pop, grid, seeds, cache_dir,
+                 engine='objects', processes=None):
+        """Constructor for the ParameterSweep class.
+
+        Parameters:
+        ----------
+            island_map: str
+
+            ini_pop: list
+
+            grid: dict
+                Dictionary with the tuples (species name or landscape
+                letter, parameter name) on keys and lists of values on
+                values, e.g., {('Carnivore', 'F'): [10.0, 50.0],
+                ('J', 'f_max'): [700.0, 800.0]}.
+
+            seeds: list
+
+            cache_dir: str
+                Directory of the cache, created if necessary.
+
+            engine: str
+
+            processes: int or None
+                Number of worker processes, the number of cores if
+                None.
+        """
+        self.island_map = island_map
+        self.ini_pop = ini_pop
+        self.grid = grid
+        self.seeds = list(seeds)
+        self.cache_dir = cache_dir
+        self.engine = engine
+        self.processes = os.cpu_count() if processes is None \
+            else processes
+        self.computed = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def points(self):
+        """This method returns the parameters of each point of the
+        grid.
+
+        Returns:
+        ----------
+            List of dictionaries with the species names or landscape
+            letters on keys and parameter dictionaries on values.
+        """
+        names = list(self.grid.keys())
+        points = []
+        for values in itertools.product(*self.grid.values()):
+            params = {}
+            for (param_key, name), value in zip(names, values):
+                params.setdefault(param_key, {})[name] = value
+            points.append(params)
+        return points
+
+    def cache_key(self, params, seed, num_years):
+        """This method returns the hash identifying a run.
+
+        Parameters:
+        ----------
+            params: dict
+
+            seed: int
+
+            num_years: int
+
+        Returns:
+        ----------
+            str
+        """
+        run = json.dumps({'map': self.island_map, 'ini_pop': self.ini_pop,
+                          'params': params, 'engine': self.engine,
+                          'seed': seed, 'years': num_years},
+                         sort_keys=True)
+        return hashlib.sha256(run.encode()).hexdigest()
+
+    def cache_file(self, key):
+        """This method returns the cache file of a run.
+
+        Parameters:
+        ----------
+            key: str
+
+        Returns:
+        ----------
+            str
+        """
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def store(self, key, totals):
+        """This method writes the totals of a run to the cache, through
+        a temporary file, such that an interrupted sweep never leaves a
+        partial entry.
+
+        Parameters:
+        ----------
+            key: str
+
+            totals: array
+        """
+        temporary = self.cache_file(key) + '.tmp'
+        with open(temporary, 'wb') as file:
+            np.save(file, totals)
+        os.replace(temporary, self.cache_file(key))
+
+    def run(self, num_years):
+        """This method runs the sweep, computing in the pool the runs
+        missing from the cache.
+
+        Parameters:
+        ----------
+            num_years: int
+
+        Returns:
+        ----------
+            List of dictionaries with the 'params', the 'seed' and the
+            'totals' of each run, for each point of the grid and each
+            seed, where 'totals' is the 2D array with the species
+            totals of each year.
+        """
+        runs = []
+        for params in self.points():
+            merged = current_parameters(params)
+            runs.extend({'params': params, 'merged': merged, 'seed': seed,
+                         'key': self.cache_key(merged, seed, num_years)}
+                        for seed in self.seeds)
+        tasks = {run['key']: (run['key'], self.island_map, self.ini_pop,
+                              run['merged'], self.engine, run['seed'],
+                              num_years)
+                 for run in runs
+                 if not os.path.exists(self.cache_file(run['key']))}
+        if tasks:
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(min(self.processes, len(tasks))) as pool:
+                for key, totals in pool.imap_unordered(run_point,
+                                                       tasks.values()):
+                    self.store(key, totals)
+                    self.computed += 1
+        return [{'params': run['params'], 'seed': run['seed'],
+                 'totals': np.load(self.cache_file(run['key']))}
+                for run in runs]
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the termination criteria model which functions with the BioSim
+package written for the INF200 project January 2019..
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import time
+import operator
+import collections
+
+
+class Criterion:
+    """Criterion ending a simulation before its number of years. It is
+    checked at the end of each year with the species totals kept by
+    the island, so checking it costs O(number of species), never
+    O(number of animals)."""
+
+    def start(self):
+        """This method is called when a simulation starts."""
+
+    def check(self, state):
+        """This method checks the state of the year.
+
+        Parameters:
+        ----------
+            state: YearState
+                The state yielded by 'BioSim.run()'.
+
+        Returns:
+        ----------
+            The reason to stop, as str, or None to go on.
+        """
+        raise NotImplementedError
+
+
+class Extinction(Criterion):
+    """Stops when a species has no animals left."""
+
+    def __init__(self, species):
+        """Constructor for the Extinction class.
+
+        Parameters:
+        ----------
+            species: str
+        """
+        self.species = species
+
+    def check(self, state):
+        """This method stops the simulation when the species has no
+        animals left, see 'Criterion.check()'."""
+        if state.counts[self.species] == 0:
+            return '{} extinct'.format(self.species)
+        return None
+
+
+class AllDead(Criterion):
+    """Stops when the island has no animals left."""
+
+    def check(self, state):
+        """This method stops the simulation when the island has no
+        animals left, see 'Criterion.check()'."""
+        if sum(state.counts.values()) == 0:
+            return 'all animals dead'
+        return None
+
+
+class SteadyState(Criterion):
+    """Stops when the totals of every species stay within a tolerance
+    band over a rolling window of years, i.e., when the difference
+    between the largest and the smallest total of the window is at
+    most 'tolerance' times the mean total of the window. The sum of the
+    window is kept up to date, and its largest and smallest totals in
+    monotonic queues, so each check costs O(number of species)
+    amortized, whatever the window."""
+
+    def __init__(self, window=50, tolerance=0.05):
+        """Constructor for the SteadyState class.
+
+        Parameters:
+        ----------
+            window: int
+                Number of years of the window.
+
+            tolerance: float
+                Width of the band, relative to the mean total.
+        """
+        self.window = window
+        self.tolerance = tolerance
+        self.start()
+
+    def start(self):
+        """This method empties the window."""
+        self.year = 0
+        self.sums = {}
+        self.history = {}
+        self.maxima = {}
+        self.minima = {}
+
+    @staticmethod
+    def push(extremes, year, total, dominates):
+        """This method appends the total of a year to a monotonic queue
+        of the window, dropping the totals it dominates, which can no
+        longer be the extreme of the window.
+
+        Parameters:
+        ----------
+            extremes: collections.deque
+                Queue of the tuples (year, total).
+
+            year: int
+
+            total: int
+
+            dominates: function
+                Function telling if a total dominates another, i.e.,
+                is at least as large for the maxima and at least as
+                small for the minima.
+        """
+        while extremes and dominates(total, extremes[-1][1]):
+            extremes.pop()
+        extremes.append((year, total))
+
+    def check(self, state):
+        """This method stops the simulation when the window is full and
+        the totals of every species are within the band, see
+        'Criterion.check()'."""
+        oldest = self.year - self.window
+        steady = self.year + 1 >= self.window
+        for species, total in state.counts.items():
+            history = self.history.setdefault(species, collections.deque())
+            maxima = self.maxima.setdefault(species, collections.deque())
+            minima = self.minima.setdefault(species, collections.deque())
+            history.append(total)
+            self.sums[species] = self.sums.get(species, 0) + total
+            if len(history) > self.window:
+                self.sums[species] -= history.popleft()
+            self.push(maxima, self.year, total, operator.ge)
+            self.push(minima, self.year, total, operator.le)
+            for extremes in (maxima, minima):
+                if extremes[0][0] <= oldest:
+                    extremes.popleft()
+            mean = self.sums[species] / len(history)
+            if maxima[0][1] - minima[0][1] > self.tolerance * mean:
+                steady = False
+        self.year += 1
+        if steady:
+            return 'steady state over {} years'.format(self.window)
+        return None
+
+
+class WallClockBudget(Criterion):
+    """Stops when the wall-clock time of the simulation reaches a
+    budget."""
+
+    clock = staticmethod(time.perf_counter)
+    name = 'wall-clock'
+
+    def __init__(self, seconds):
+        """Constructor for the WallClockBudget class.
+
+        Parameters:
+        ----------
+            seconds: float
+        """
+        self.seconds = seconds
+        self.started = None
+
+    def start(self):
+        """This method starts the clock."""
+        self.started = self.clock()
+
+    def check(self, state):
+        """This method stops the simulation when the clock has run for
+        the budget, see 'Criterion.check()'."""
+        if self.clock() - self.started >= self.seconds:
+            return '{} budget of {} s spent'.format(self.name,
+                                                    self.seconds)
+        return None
+
+
+class CPUBudget(WallClockBudget):
+    """Stops when the CPU time of the process during the simulation
+    reaches a budget."""
+
+    clock = staticmethod(time.process_time)
+    name = 'CPU'
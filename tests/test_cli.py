@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the command-line pytest package which is a test package for the
+BioSim packages written for the INF200 project January 2019.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import json
+import numpy as np
+from biosim.cli import main
+from biosim.fauna import Herbivore
+from biosim.island import Island
+
+SCENARIO = {
+    "map": ["OOOOO", "OJSJO", "OOOOO"],
+    "ini_pop": [{"loc": [1, 2],
+                 "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                         for _ in range(10)]}],
+    "injections": [{"year": 3,
+                    "population": [{"loc": [1, 1],
+                                    "pop": [{"species": "Carnivore",
+                                             "age": 5, "weight": 20}]}]}],
+    "years": 5,
+    "seeds": [1, 2],
+    "engine": "arrays"}
+
+
+def test_cli_runs_scenario(tmpdir, capsys):
+    """Test if the command runs every seed of the scenario, adds the
+    injected populations, writes the totals and prints the metrics"""
+    scenario = tmpdir.join('scenario.json')
+    scenario.write(json.dumps(SCENARIO))
+    output = str(tmpdir.join('totals.npz'))
+    assert main([str(scenario), '--output', output]) == 0
+    metrics = json.loads(capsys.readouterr().out)
+    assert metrics['years'] == 10
+    assert metrics['engine'] == 'arrays'
+    assert metrics['years_per_s'] > 0
+    totals = np.load(output)['totals']
+    assert totals.shape == (2, 5, 2)
+    assert (totals[:, :3, 1] == 0).all()
+    assert (totals[:, 3, 1] > 0).any()
+
+
+def test_cli_invalid_scenario(tmpdir, capsys):
+    """Test if the command exits with the status 2 on an invalid
+    scenario"""
+    scenario = tmpdir.join('scenario.json')
+    scenario.write(json.dumps({"map": "OOO\nOJO\nOOO", "years": 5}))
+    assert main([str(scenario)]) == 2
+    assert 'ini_pop' in capsys.readouterr().err
+
+
+def test_cli_output_format_from_extension(tmpdir, capsys):
+    """Test if the output format is taken from the extension and if the
+    path written is the one reported"""
+    scenario = tmpdir.join('scenario.json')
+    scenario.write(json.dumps(SCENARIO))
+    output = str(tmpdir.join('out.json'))
+    assert main([str(scenario), '--output', output]) == 0
+    assert json.loads(capsys.readouterr().out)['output'] == output
+    with open(output) as file:
+        assert np.array(json.load(file)['totals']).shape == (2, 5, 2)
+
+    output = str(tmpdir.join('out'))
+    assert main([str(scenario), '--output', output]) == 0
+    assert json.loads(capsys.readouterr().out)['output'] == output + '.npz'
+    assert np.load(output + '.npz')['totals'].shape == (2, 5, 2)
+
+
+def test_cli_invalid_injection(tmpdir, capsys):
+    """Test if an injection at a non-habitable location or out of the
+    simulated years is refused before the run"""
+    for injection in ({"year": 3, "population": [
+                          {"loc": [0, 0],
+                           "pop": [{"species": "Carnivore", "age": 5,
+                                    "weight": 20}]}]},
+                      {"year": 5, "population": []}):
+        scenario = tmpdir.join('scenario.json')
+        scenario.write(json.dumps(dict(SCENARIO, injections=[injection])))
+        assert main([str(scenario)]) == 2
+        assert 'invalid scenario' in capsys.readouterr().err
+
+
+def test_cli_restores_parameters(tmpdir, capsys):
+    """Test if the parameters of the scenario are restored after a run
+    in the calling process"""
+    gamma = Herbivore.parameters['gamma']
+    scenario = tmpdir.join('scenario.json')
+    scenario.write(json.dumps(dict(SCENARIO,
+                                   params={"Herbivore": {"gamma": 0.0}})))
+    assert main([str(scenario)]) == 0
+    assert Herbivore.parameters['gamma'] == gamma
+
+
+def test_cli_invalid_parameters_and_engine(tmpdir, capsys):
+    """Test if invalid parameter values and engines are refused before
+    the run, leaving the parameters unchanged"""
+    f_max = Island.geo_classes['J'].parameters['f_max']
+    scenario = tmpdir.join('scenario.json')
+    scenario.write(json.dumps(dict(SCENARIO,
+                                   params={"J": {"f_max": -5}})))
+    assert main([str(scenario)]) == 2
+    assert 'invalid scenario' in capsys.readouterr().err
+    assert Island.geo_classes['J'].parameters['f_max'] == f_max
+
+    scenario.write(json.dumps(dict(SCENARIO, engine="vectors")))
+    assert main([str(scenario)]) == 2
+    assert main([str(scenario), '--engine', 'objects']) == 0
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the ensemble pytest package which is a test package for the
+BioSim packages written for the INF200 project January 2019.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import numpy as np
+import pytest
+from biosim.ensemble import BioSimEnsemble, current_parameters, \
+    apply_parameters
+from biosim.fauna import Herbivore
+from biosim.island import Island
+
+ISLAND_MAP = "OOOOO\nOJSJO\nOOOOO"
+INI_POP = [
+    {"loc": (1, 2),
+     "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+             for _ in range(20)]}]
+
+
+@pytest.fixture(autouse=True)
+def reset_parameters():
+    """Restores the parameters of the species and landscapes changed by
+    a test"""
+    params = current_parameters()
+    yield
+    apply_parameters(params)
+
+
+def run_in_process(seed, num_years):
+    """Returns the species totals of each year of the scenario run in
+    the test process"""
+    island = Island(ISLAND_MAP, seed=seed)
+    island.add_population(INI_POP)
+    totals = []
+    for _ in range(num_years):
+        island.yearly_cycle()
+        totals.append(list(island.totals))
+    return totals
+
+
+def test_ensemble_matches_replicas():
+    """Test if each replica of the ensemble is the simulation of its
+    seed and if the mean and quantiles are taken over the replicas"""
+    ensemble = BioSimEnsemble(ISLAND_MAP, INI_POP, [1, 2, 3],
+                              processes=2)
+    result = ensemble.run(4, quantiles=(0.5,))
+    assert result['totals'].shape == (3, 4, 2)
+    assert result['totals'][1].tolist() == run_in_process(2, 4)
+    assert result['mean']['Herbivore'] == \
+        pytest.approx(result['totals'][:, :, 0].mean(axis=0))
+    assert result['quantiles'][0.5]['Carnivore'] == \
+        pytest.approx(np.zeros(4))
+
+
+def test_ensemble_parameters():
+    """Test if the parameters given reach the replicas, where
+    herbivores without births can only decrease"""
+    ensemble = BioSimEnsemble(ISLAND_MAP, INI_POP, [1, 2],
+                              params={'Herbivore': {'gamma': 0.0}},
+                              processes=2)
+    totals = ensemble.run(5)['totals'][:, :, 0]
+    assert (np.diff(totals, axis=1) <= 0).all()
+
+
+def test_ensemble_current_parameters():
+    """Test if the replicas run with the parameters the species have
+    in the calling process when the ensemble is created"""
+    Herbivore.set_parameters({'gamma': 0.0, 'omega': 0.0})
+    ensemble = BioSimEnsemble(ISLAND_MAP, INI_POP, [4], processes=1)
+    assert ensemble.run(5)['totals'][0].tolist() == run_in_process(4, 5)
@@ -11,7 +11,8 @@ __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 import pytest
 from biosim.simulation import BioSim
 import numpy as np
-from biosim.fauna import Herbivore, Carnivore
+from biosim.fauna import Herbivore, Carnivore, Herd
+from biosim.rng import RandomBuffer
 import random as rd
 
 rd.seed(123456)
@@ -218,3 +219,103 @@ def test_carnivore_kill(mocker):
     carnivore.fitness = 0.9
     assert carnivore.will_kill(herbivore.fitness)
 
+
+def test_herd_columns():
+    """Test if a Herd stores the ages and weights as NumPy columns and
+    computes the same fitness as the Population objects"""
+    herd = Herd(Herbivore, [10, 5], [20, 30])
+    assert len(herd) == 2
+    assert herd.age.dtype == np.int64
+    assert herd.fitness[0] == pytest.approx(Herbivore(10, 20).fitness)
+    assert herd.fitness[1] == pytest.approx(Herbivore(5, 30).fitness)
+
+
+def test_herd_take_and_extend():
+    """Test if the method 'take()' moves the selected animals to a new
+    herd and 'extend()' appends them back"""
+    herd = Herd(Carnivore, [1, 2, 3], [10, 20, 30])
+    taken = herd.take(np.array([True, False, True]))
+    assert list(taken.age) == [1, 3]
+    assert list(herd.age) == [2]
+    herd.extend(taken)
+    assert list(herd.weight) == [20, 10, 30]
+    assert len(herd.fitness) == 3
+
+
+def test_herd_yearly_rules():
+    """Test if the herd ages, loses weight and updates its fitness"""
+    herd = Herd(Herbivore, [10, 10], [50, 40])
+    fitness_before = herd.fitness.copy()
+    herd.lose_weight()
+    herd.get_old()
+    assert list(herd.age) == [11, 11]
+    assert list(herd.weight) == [47.5, 38.0]
+    assert all(herd.fitness < fitness_before)
+
+
+def test_herd_zero_weight_dies():
+    """Test if animals with no weight have fitness 0 and always die"""
+    herd = Herd(Herbivore, [10, 10], [0, 40])
+    assert herd.fitness[0] == 0
+    assert herd.will_die(RandomBuffer(1))[0]
+
+
+def test_herd_birth():
+    """Test if a lone animal never gives birth and if the mothers lose
+    'xi' times the newborn weight"""
+    rng = RandomBuffer(1)
+    assert len(Herd(Carnivore, [5], [50]).give_birth(rng)) == 0
+    herd = Herd(Carnivore, [5] * 200, [50] * 200)
+    newborns = herd.give_birth(rng)
+    assert len(newborns) > 0
+    assert all(newborns.age == 0)
+    assert herd.weight.sum() == pytest.approx(
+        200 * 50 - Carnivore.parameters['xi'] * newborns.weight.sum())
+
+
+def test_batch_fitness():
+    """Test if the method 'batch_fitness()' returns, in one call, the
+    same fitness as 'calculate_fitness()' for each animal, and 0 for
+    animals with no weight"""
+    ages, weights = [0, 10, 15, 80], [8.0, 20.0, 0.0, 35.0]
+    fitness = Carnivore.batch_fitness(ages, weights, Carnivore.parameters)
+    expected = [Carnivore.calculate_fitness(age, weight,
+                                            Carnivore.parameters)
+                for age, weight in zip(ages, weights)]
+    assert fitness == pytest.approx(expected)
+    assert fitness[2] == 0
+
+
+def test_lazy_fitness():
+    """Test if changing the weight or the age outdates the fitness,
+    which is only calculated again when read"""
+    animal = Herbivore(10, 50)
+    animal.update_fitness()
+    assert not animal.fitness_outdated
+    animal.lose_weight()
+    animal.get_old()
+    assert animal.fitness_outdated
+    assert animal.fitness == pytest.approx(
+        Herbivore.calculate_fitness(11, 47.5, Herbivore.parameters))
+    assert not animal.fitness_outdated
+
+
+def test_herd_lazy_fitness():
+    """Test if the herd fitness column is outdated by weight changes
+    and calculated again on read, also after compacting the herd"""
+    herd = Herd(Herbivore, [10, 20], [50, 40])
+    herd.lose_weight()
+    herd.keep(np.array([False, True]))
+    assert herd.fitness == pytest.approx(
+        [Herbivore.calculate_fitness(20, 38.0, Herbivore.parameters)])
+
+
+def test_decisions_with_given_random_number():
+    """Test if the decision methods use the random number given by the
+    landscape cell instead of numpy.random"""
+    animal = Herbivore(10, 50)
+    animal.fitness = 0.5
+    assert animal.will_migrate(0.1)
+    assert not animal.will_migrate(0.2)
+    assert animal.will_die(0.1)
+    assert not animal.will_die(0.3)
@@ -11,7 +11,9 @@ __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 import pytest
 import random as rd
 from biosim.simulation import BioSim
-from biosim.geography import Jungle, Savannah
+from biosim.geography import Cells, Jungle, Savannah, Desert
+from biosim.fauna import Herbivore, Carnivore
+from biosim.rng import RandomBuffer
 import numpy as np
 
 
@@ -234,3 +236,123 @@ def test_migration():
     assert south_neighbour is not 0
     assert west_neighbour is not 0
     assert east_neighbour is not 0
+
+
+def test_update_fitness():
+    """Test if the method 'update_fitness()' updates the fitness of all
+    the animals of a list at once"""
+    herbivores = [Herbivore(10, 20), Herbivore(30, 5)]
+    for herbivore in herbivores:
+        herbivore.weight += 10
+    Jungle.update_fitness(herbivores)
+    for herbivore in herbivores:
+        assert herbivore.fitness == pytest.approx(
+            Herbivore.calculate_fitness(herbivore.age, herbivore.weight,
+                                        Herbivore.parameters))
+
+
+def test_destinations():
+    """Test if the method 'destinations()' draws the neighbours of all
+    the migrating animals according to the cumulative probabilities"""
+    cell = Jungle(rng=RandomBuffer(5))
+    destination = cell.destinations(np.array([0.25, 0.25, 1.0]), 4000)
+    assert len(destination) == 4000
+    assert not any(destination == 1)
+    assert np.mean(destination == 0) == pytest.approx(0.25, abs=0.03)
+
+
+def test_migration_keeps_animals():
+    """Test if the migration moves each migrating animal to exactly one
+    neighbour and keeps the others in the cell"""
+    island_map = "OOOOO\nOJJJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(500)]}]
+    t = BioSim(island_map, ini_pop, 3)
+    cell = t.island.cells[(1, 2)]
+    cell.migrate(t.island.neighbour_cells((1, 2)))
+    moved = [len(t.island.cells[loc].new_population['Herbivore'])
+             for loc in [(1, 1), (1, 3)]]
+    assert all(n > 0 for n in moved)
+    assert len(cell.population['Herbivore']) + sum(moved) == 500
+
+
+def test_hunt(monkeypatch):
+    """Test if the method 'hunt()' lets each carnivore kill, in order,
+    only herbivores with less fitness until it has eaten 'F', and marks
+    the killed herbivores without removing them"""
+    monkeypatch.setitem(Carnivore.parameters, 'DeltaPhiMax', 0.01)
+    monkeypatch.setitem(Carnivore.parameters, 'F', 50.0)
+    cell = Jungle(rng=RandomBuffer(2))
+    prey_fitness = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.9])
+    prey_weight = np.full(6, 20.0)
+    amount_eaten, killed = cell.hunt(np.array([0.8, 0.35, 0.05]),
+                                     prey_fitness, prey_weight)
+    assert list(amount_eaten) == [50.0, 0.0, 0.0]
+    assert list(killed) == [True, True, True, False, False, False]
+    assert len(prey_weight) == 6
+
+
+
+def test_hunt_blocks(monkeypatch):
+    """Test if the method 'hunt()' gives the same kills when the prey
+    are drawn in small blocks and the killed ones are compacted away,
+    and if a carnivore only draws numbers for the prey it reaches"""
+    monkeypatch.setitem(Carnivore.parameters, 'DeltaPhiMax', 1e-6)
+    monkeypatch.setitem(Carnivore.parameters, 'F', 25.0)
+    monkeypatch.setattr(Jungle, 'hunt_block', 2)
+    cell = Jungle(rng=RandomBuffer(2))
+    drawn = []
+    uniforms = cell.rng.uniforms
+    monkeypatch.setattr(cell.rng, 'uniforms',
+                        lambda n: drawn.append(n) or uniforms(n))
+    prey_fitness = np.linspace(0.0, 0.5, 100)
+    prey_weight = np.full(100, 10.0)
+    amount_eaten, killed = cell.hunt(np.full(20, 0.9), prey_fitness,
+                                     prey_weight)
+    assert list(amount_eaten) == [25.0] * 20
+    assert killed.tolist() == [True] * 60 + [False] * 40
+    assert sum(drawn) <= 20 * (2 + 4)
+
+def test_carnivore_feed_compacts_herbivores(monkeypatch):
+    """Test if the killed herbivores are removed once from the
+    population, also when they are next to each other"""
+    monkeypatch.setitem(Carnivore.parameters, 'DeltaPhiMax', 0.01)
+    monkeypatch.setitem(Carnivore.parameters, 'F', 50.0)
+    island_map = "OOO\nOJO\nOOO"
+    ini_pop = [
+        {"loc": (1, 1),
+         "pop": [{"species": "Herbivore", "age": 50, "weight": 5}
+                 for _ in range(20)] +
+                [{"species": "Carnivore", "age": 5, "weight": 40}]}]
+    for engine in ('objects', 'arrays'):
+        t = BioSim(island_map, ini_pop, 1, engine=engine)
+        cell = t.island.cells[(1, 1)]
+        cell.carnivore_feed()
+        assert len(cell.population['Herbivore']) == 10
+
+
+def test_fodder_eaten(monkeypatch):
+    """Test if the method 'fodder_eaten()' gives 'F' to the first
+    herbivores, the remainder to the next one and nothing to the
+    others, and removes the eaten fodder"""
+    monkeypatch.setitem(Herbivore.parameters, 'F', 10.0)
+    cell = Jungle()
+    cell.fodder = 25.0
+    assert list(cell.fodder_eaten(4)) == [10.0, 10.0, 5.0, 0.0]
+    assert cell.fodder == 0
+
+
+def test_regrow_years():
+    """Test if the closed form of many years of fodder growth matches
+    the growth applied year by year"""
+    fodder = np.array([0.0, 50.0, 250.0, 90.0])
+    years = np.array([3, 1, 7, 0])
+    for geo_class in (Savannah, Jungle, Desert, Cells):
+        expected = fodder.copy()
+        for i, k in enumerate(years):
+            for _ in range(k):
+                expected[i] = geo_class.regrow(expected[i])
+        assert geo_class.regrow_years(fodder, years) == \
+            pytest.approx(expected)
@@ -8,9 +8,11 @@ BioSim packages written for the INF200 project January 2019.
 __author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
 __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 
+import numpy as np
 import pytest
 from biosim.simulation import BioSim
 from biosim.island import Island
+from biosim.geography import Savannah
 
 
 def test_check_string_instance():
@@ -80,6 +82,29 @@ def test_invalid_character():
         Island.check_invalid_character(island_map)
 
 
+def test_wide_map():
+    """Test if a map wider than 256 columns is accepted and if
+    'habitable_cells' holds every habitable cell"""
+    island_map = '\n'.join(['O' * 300, 'O' + 'J' * 298 + 'O', 'O' * 300])
+    island = Island(island_map)
+    assert island.landscape.shape == (3, 300)
+    assert len(island.habitable_cells) == 298
+    assert list(island.habitable_cells)[0] == (1, 1)
+    assert (0, 0) not in island.habitable_cells
+
+
+def test_cells_out_of_map():
+    """Test if coordinates out of the map, negative ones included, are
+    no cells instead of wrapping around or raising an IndexError"""
+    island = Island("OOOOO\nOJJJO\nOOOOO")
+    for loc in ((-2, 1), (10, 0), (1, -1), (1, 5)):
+        assert loc not in island.habitable_cells
+        assert island.habitable_cells.get(loc) is None
+        with pytest.raises(KeyError):
+            island.cells[loc]
+    assert len(island.cells) == 0
+
+
 def test_age_stored():
     """Test if the method 'def add_population()' correctly store the age
     on animal_object"""
@@ -165,3 +190,139 @@ def test_get_population_numbers():
     row_loc, col_loc = pop['Row'][7], pop['Col'][7]
     pop_herb, pop_carn = pop['Herbivore'][7], pop['Carnivore'][7]
     assert row_loc is 1 and col_loc is 2 and pop_herb and pop_carn is 1
+
+
+def test_unknown_engine():
+    """Test if the method 'check_engine()' identifies an unknown
+    population storage engine and raises ValueError"""
+    with pytest.raises(ValueError):
+        Island("OOO\nOJO\nOOO", engine='dataframes')
+
+
+def test_arrays_engine_yearly_cycle():
+    """Test if the columnar engine stores the animals in Herds and runs
+    the yearly cycle end to end"""
+    island_map = "OOOOO\nOJSJO\nOJDJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(50)] +
+                [{"species": "Carnivore", "age": 5, "weight": 20}
+                 for _ in range(10)]}]
+    island = Island(island_map, engine='arrays')
+    island.add_population(ini_pop)
+    cell = island.cells[(1, 2)]
+    assert len(cell.population['Herbivore']) == 50
+    assert len(cell.population['Carnivore']) == 10
+    for _ in range(10):
+        island.yearly_cycle()
+    pop = island.get_population_numbers()
+    assert sum(pop['Herbivore']) > 0
+    assert sum(n > 0 for n in pop['Herbivore']) > 1
+
+
+def test_neighbour_index():
+    """Test if the neighbour index built at construction holds the
+    habitable neighbours of each habitable cell"""
+    island = Island("OOOOO\nOJDJO\nOOJJO\nOJSJO\nOOOOO")
+    i = island.cell_index[(2, 2)]
+    neighbours = island.neighbour_idx[
+        island.neighbour_ptr[i]:island.neighbour_ptr[i + 1]]
+    assert sorted(tuple(island.habitable_locs[j]) for j in neighbours) == \
+        [(1, 2), (2, 3), (3, 2)]
+    assert island.cell_index[(0, 0)] == -1
+    assert island.neighbour_cells((2, 2)) is not \
+        island.neighbour_cells((2, 2))
+
+
+def test_cells_created_on_demand():
+    """Test if the island stores the landscape as uint8 codes and only
+    creates the landscape objects of habitable cells when accessed"""
+    island = Island("OOOOO\nOJSDO\nOMOOO\nOOOOO")
+    assert island.landscape.dtype == np.uint8
+    assert island.landscape[1, 3] == Island.landscape_codes['D']
+    assert len(island.cells) == 0
+    assert isinstance(island.cells[(1, 2)], Savannah)
+    assert list(island.cells.keys()) == [(1, 2)]
+    with pytest.raises(KeyError):
+        island.cells[(0, 0)]
+    with pytest.raises(KeyError):
+        island.cells[(2, 1)]
+    assert (0, 0) not in island.cells
+    pop = island.get_population_numbers()
+    assert len(pop['Herbivore']) == 20
+
+
+def test_fodder_grid():
+    """Test if the cells read and write their fodder in the island
+    fodder grid and if the grid regrows all cells at once"""
+    island = Island("OOOOO\nOJSDO\nOOOOO")
+    island.active_cells = {(1, 1), (1, 2), (1, 3)}
+    jungle, savannah = island.cells[(1, 1)], island.cells[(1, 2)]
+    assert island.fodder[1, 1] == jungle.fodder
+    jungle.fodder, savannah.fodder = 10.0, 100.0
+    island.cells[(1, 3)].fodder = 5.0
+    assert island.fodder[1, 1] == 10.0
+    island.grow_fodder()
+    assert jungle.fodder == jungle.parameters['f_max']
+    alpha, f_max = savannah.parameters['alpha'], savannah.parameters['f_max']
+    assert savannah.fodder == pytest.approx(100 + alpha * (f_max - 100))
+    assert island.cells[(1, 3)].fodder == 0
+
+
+def test_active_cells():
+    """Test if the yearly cycle only schedules the occupied cells and
+    if the fodder of the idle cells is caught up later"""
+    island = Island("OOOOOOO\nOSJJMSO\nOOOOOOO")
+    island.add_population([
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}]}])
+    assert island.active_cells == {(1, 2)}
+    island.cells[(1, 5)].fodder = 100.0
+    for _ in range(3):
+        island.yearly_cycle()
+    assert island.fodder[1, 5] == 100.0
+    island.catch_up_fodder()
+    alpha, f_max = (Savannah.parameters['alpha'],
+                    Savannah.parameters['f_max'])
+    fodder = 100.0
+    for _ in range(3):
+        fodder += alpha * (f_max - fodder)
+    assert island.fodder[1, 5] == pytest.approx(fodder)
+    pop = island.get_population_numbers()
+    occupied = {(row, col) for row, col, herbs in
+                zip(pop['Row'], pop['Col'], pop['Herbivore']) if herbs}
+    assert island.active_cells == occupied
+
+
+def test_active_index():
+    """Test if the active index holds the flat indices of the active
+    cells and of their habitable neighbours only"""
+    island = Island("OOOOOOO\nOSJJMSO\nOJOOOSO\nOOOOOOO")
+    assert island.active_index().size == 0
+    island.add_population([
+        {"loc": (1, 1),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}]},
+        {"loc": (2, 5),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}]}])
+    assert island.active_index().tolist() == [8, 9, 12, 15, 19]
+
+@pytest.mark.parametrize('engine', ['objects', 'arrays'])
+def test_population_counters(engine):
+    """Test if the population counters and totals kept by the island
+    match a recount after births, deaths, kills and migrations"""
+    island = Island("OOOOO\nOJSJO\nOJDJO\nOOOOO", engine=engine, seed=3)
+    island.add_population([
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(40)] +
+                [{"species": "Carnivore", "age": 5, "weight": 20}
+                 for _ in range(8)]}])
+    assert island.species_totals() == {'Herbivore': 40, 'Carnivore': 8}
+    for _ in range(10):
+        island.yearly_cycle()
+        assert island.counts_consistent()
+    pop = island.get_population_numbers()
+    assert island.species_totals() == {
+        'Herbivore': sum(pop['Herbivore']),
+        'Carnivore': sum(pop['Carnivore'])}
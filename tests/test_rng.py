@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the random number pytest package which is a test package for
+the BioSim packages written for the INF200 project January 2019.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import pytest
+import numpy as np
+from biosim.rng import RandomBuffer
+from biosim.simulation import BioSim
+
+
+def test_check_block_size():
+    """Test if the method 'check_block_size()' identifies a non-positive
+    block size and raises ValueError"""
+    with pytest.raises(ValueError):
+        RandomBuffer(1, block_size=0)
+
+
+def test_same_stream_as_generator():
+    """Test if the numbers served from the blocks, one by one or in bulk
+    across block borders, are the same stream of the Generator"""
+    expected = np.random.default_rng(12).random(40)
+    rng = RandomBuffer(12, block_size=16)
+    served = [rng.random()] + list(rng.uniforms(20)) + \
+        [rng.random() for _ in range(3)] + list(rng.uniforms(16))
+    assert served == pytest.approx(list(expected))
+
+
+def test_large_request():
+    """Test if a request larger than a block is served"""
+    rng = RandomBuffer(3, block_size=8)
+    numbers = rng.uniforms(100)
+    assert len(numbers) == 100
+    assert all((0 <= numbers) & (numbers < 1))
+
+
+def test_simulation_independent_of_global_seed():
+    """Test if the same BioSim seed gives the same simulation, whatever
+    the global numpy random state is"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(30)]}]
+    counts = []
+    for global_seed in (1, 2):
+        np.random.seed(global_seed)
+        sim = BioSim(island_map, ini_pop, seed=42)
+        for _ in range(5):
+            sim.island.yearly_cycle()
+        counts.append(sim.island.get_population_numbers())
+    assert counts[0] == counts[1]
@@ -8,9 +8,16 @@ BioSim packages written for the INF200 project January 2019.
 __author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
 __email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
 
+import os
+import subprocess
+import sys
+import textwrap
+import numpy as np
 import pytest
 from biosim.simulation import BioSim
 
+IMPORT_TIME_BUDGET = 1.0
+
 
 def test_set_animal_parameters():
     """Test if the method set_animal_parameters() raises a TypeError
@@ -128,3 +135,210 @@ def test_num_animals():
     num_carn = t.num_animals_per_species['Carnivore']
     assert num_herb is 4
     assert num_carn is 3
+
+
+def test_headless_simulate():
+    """Test if a simulation without visualization and figures runs the
+    model without creating any figure"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(10)]}]
+    t = BioSim(island_map, ini_pop, seed=1)
+    t.simulate(num_years=5, vis_years=None)
+    assert t.year == 5
+    assert t.fig is None
+
+
+def test_import_time_budget():
+    """Test if importing the simulation module loads neither pandas,
+    matplotlib nor numba, and stays within the import-time budget"""
+    code = textwrap.dedent("""
+        import sys
+        import time
+        start = time.perf_counter()
+        import biosim.simulation
+        elapsed = time.perf_counter() - start
+        heavy = [name for name in ('pandas', 'matplotlib', 'numba')
+                 if name in sys.modules]
+        print(elapsed, heavy)
+    """)
+    output = subprocess.check_output(
+        [sys.executable, '-c', code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ, PYTHONPATH=''))
+    elapsed, heavy = output.decode().split(' ', 1)
+    assert heavy.strip() == '[]'
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+
+
+def test_render_async(tmpdir):
+    """Test if the asynchronous renderer writes every figure asked,
+    while the simulation runs in the main process"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(10)]}]
+    img_base = os.path.join(str(tmpdir), 'frame')
+    t = BioSim(island_map, ini_pop, seed=1, img_base=img_base,
+               render_async=True)
+    t.simulate(num_years=3, vis_years=None, img_years=1)
+    t.close_renderer()
+    assert t.fig is None
+    assert sorted(os.listdir(str(tmpdir))) == \
+        ['frame_00000.png', 'frame_00001.png', 'frame_00002.png']
+
+
+def test_render_async_failure(tmpdir):
+    """Test if an exception of the renderer process is raised again in
+    the simulation, instead of blocking it"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    img_base = os.path.join(str(tmpdir), 'missing', 'frame')
+    t = BioSim(island_map, [], seed=1, img_base=img_base,
+               render_async=True)
+    with pytest.raises(FileNotFoundError):
+        t.simulate(num_years=10, vis_years=None, img_years=1)
+    assert t.renderer.failed
+    t.close_renderer()
+    assert t.renderer is None
+
+
+def test_movie_frames_piped(tmpdir, monkeypatch):
+    """Test if the movie mode pipes one raw RGBA frame per figure into
+    the ffmpeg process, without writing image files"""
+    fake_ffmpeg = tmpdir.join('ffmpeg')
+    fake_ffmpeg.write('#!{}\nimport shutil, sys\n'
+                      'with open(sys.argv[-1], "wb") as movie:\n'
+                      '    shutil.copyfileobj(sys.stdin.buffer, movie)\n'
+                      .format(sys.executable))
+    fake_ffmpeg.chmod(0o755)
+    monkeypatch.setattr('biosim.rendering.FFMPEG_BINARY', str(fake_ffmpeg))
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    img_base = os.path.join(str(tmpdir), 'movie')
+    t = BioSim(island_map, [], seed=1, img_base=img_base,
+               movie_fmt='mp4')
+    t.simulate(num_years=3, vis_years=None, img_years=1)
+    width, height = t.fig.canvas.get_width_height()
+    t.create_mp4()
+    assert os.path.getsize(img_base + '.mp4') == 3 * width * height * 4
+    assert not tmpdir.listdir(lambda path: path.ext == '.png')
+
+
+def test_graphics_reuse_buffers():
+    """Test if the visualization caches the map array, keeps the line
+    buffers across the years and extends them for a new simulation"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(10)]}]
+    t = BioSim(island_map, ini_pop, seed=1)
+    t.simulate(num_years=3, vis_years=1)
+    assert t.generate_map_array is t.generate_map_array
+    counts = t._line_counts
+    assert counts.shape[1] >= 3
+    assert not np.isnan(counts[0, :3]).any()
+    t.simulate(num_years=5, vis_years=1)
+    assert t._line_counts.shape[1] >= 8
+    assert t._line_counts[0, :3] == pytest.approx(counts[0, :3])
+    assert t._herb_img_axis.get_animated()
+
+
+def test_record_statistics(tmpdir):
+    """Test if the recorder writes the records of every N years in
+    chunks, which are joined back by column"""
+    from biosim.recorder import StatsRecorder
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(10)]}]
+    t = BioSim(island_map, ini_pop, seed=1)
+    t.record_statistics(str(tmpdir), every=2, chunk_size=2)
+    t.simulate(num_years=10, vis_years=None)
+    t.stop_recording()
+    assert len(StatsRecorder.chunk_files(str(tmpdir))) == 3
+    history = StatsRecorder.load(str(tmpdir))
+    assert list(history['year']) == [2, 4, 6, 8, 10]
+    assert history['Herbivore'].shape == (5, 3, 5)
+    assert list(history['Herbivore_total']) == \
+        list(history['Herbivore'].sum(axis=(1, 2)))
+    assert np.isnan(history['Carnivore_weight']).all()
+    with pytest.raises(ValueError):
+        t.record_statistics(str(tmpdir))
+
+
+def test_record_statistics_buffered(tmpdir):
+    """Test if the records of many short simulations are buffered
+    until a chunk is full or the recording stops, and if they are
+    labelled with the years of the yielded states"""
+    from biosim.recorder import StatsRecorder
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    t = BioSim(island_map, [], seed=1)
+    t.record_statistics(str(tmpdir), chunk_size=1000)
+    years = []
+    for _ in range(20):
+        years.extend(state.year for state in t.run(1))
+    assert StatsRecorder.chunk_files(str(tmpdir)) == []
+    t.stop_recording()
+    assert len(StatsRecorder.chunk_files(str(tmpdir))) == 1
+    assert list(StatsRecorder.load(str(tmpdir))['year']) == years
+
+
+def test_record_statistics_chunk_bytes(tmpdir):
+    """Test if the recorder keeps the counts as uint32 and writes a
+    chunk once the buffered counts reach the byte budget"""
+    from biosim.recorder import StatsRecorder
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    t = BioSim(island_map, [], seed=1)
+    t.record_statistics(str(tmpdir), chunk_size=1000,
+                        chunk_bytes=3 * 2 * 15 * 4)
+    t.simulate(num_years=7, vis_years=None)
+    assert len(StatsRecorder.chunk_files(str(tmpdir))) == 2
+    assert t.recorder.buffer[0][1]['Herbivore'].dtype == np.uint32
+    t.stop_recording()
+    history = StatsRecorder.load(str(tmpdir))
+    assert list(history['year']) == list(range(1, 8))
+    assert history['Herbivore'].dtype == np.uint32
+
+
+def test_population_grids():
+    """Test if the population grids are read-only views with the
+    number of animals of each species per cell"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20},
+                 {"species": "Herbivore", "age": 5, "weight": 20},
+                 {"species": "Carnivore", "age": 5, "weight": 20}]}]
+    t = BioSim(island_map, ini_pop, seed=1)
+    grids = t.population_grids
+    assert grids['Herbivore'].shape == (3, 5)
+    assert grids['Herbivore'][1, 2] == 2
+    assert grids['Carnivore'].sum() == 1
+    assert not grids['Herbivore'].flags.writeable
+    assert t.total_population_grid[1, 2] == 3
+    assert t.num_animals == 3
+
+
+def test_run_yields_states():
+    """Test if the generator API yields the state of each year and if
+    stopping early only counts the years yielded"""
+    island_map = "OOOOO\nOJSJO\nOOOOO"
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                 for _ in range(10)]}]
+    t = BioSim(island_map, ini_pop, seed=1)
+    states = []
+    for state in t.run(10, grids=True):
+        states.append(state.counts['Herbivore'])
+        assert state.grids['Herbivore'].sum() == state.counts['Herbivore']
+        if state.year == 3:
+            break
+    assert len(states) == 3
+    assert t.year == 3
+    assert t.num_animals_per_species['Herbivore'] == states[-1]
+    assert [state.year for state in t.run(2)] == [4, 5]
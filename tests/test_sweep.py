@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the parameter sweep pytest package which is a test package for
+the BioSim packages written for the INF200 project January 2019.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import numpy as np
+from biosim.sweep import ParameterSweep
+
+ISLAND_MAP = "OOOOO\nOJSJO\nOOOOO"
+INI_POP = [
+    {"loc": (1, 2),
+     "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+             for _ in range(20)]}]
+
+
+def test_sweep_points(tmpdir):
+    """Test if the sweep gives one parameter set per point of the
+    grid"""
+    sweep = ParameterSweep(ISLAND_MAP, INI_POP,
+                           {('Herbivore', 'gamma'): [0.0, 0.2],
+                            ('J', 'f_max'): [700.0, 800.0, 900.0]},
+                           [1], str(tmpdir), processes=1)
+    points = sweep.points()
+    assert len(points) == 6
+    assert points[0] == {'Herbivore': {'gamma': 0.0}, 'J': {'f_max': 700.0}}
+
+
+def test_sweep_cache(tmpdir):
+    """Test if an overlapping sweep only computes the runs missing
+    from the cache and gives the cached runs back"""
+    first = ParameterSweep(ISLAND_MAP, INI_POP,
+                           {('Herbivore', 'gamma'): [0.0, 0.2]},
+                           [1, 2], str(tmpdir), processes=2)
+    results = first.run(4)
+    assert first.computed == 4
+    no_births = [run['totals'][:, 0] for run in results
+                 if run['params']['Herbivore']['gamma'] == 0.0]
+    assert all((np.diff(totals) <= 0).all() for totals in no_births)
+
+    second = ParameterSweep(ISLAND_MAP, INI_POP,
+                            {('Herbivore', 'gamma'): [0.2, 0.5]},
+                            [1, 2], str(tmpdir), processes=2)
+    overlap = second.run(4)
+    assert second.computed == 2
+    assert (overlap[0]['totals'] == results[2]['totals']).all()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the termination criteria pytest package which is a test package
+for the BioSim packages written for the INF200 project January 2019.
+"""
+
+__author__ = "Fábio Rodrigues Pereira and Rabin Senchuri"
+__email__ = "fabio.rodrigues.pereira@nmbu.no and rabin.senchuri@nmbu.no"
+
+import numpy as np
+from biosim.simulation import BioSim, YearState
+from biosim.termination import (Extinction, AllDead, SteadyState,
+                                WallClockBudget)
+
+ISLAND_MAP = "OOOOO\nOJSJO\nOOOOO"
+
+
+def state(herbivores, carnivores):
+    """Returns a year state with the given totals."""
+    return YearState(1, {'Herbivore': herbivores,
+                         'Carnivore': carnivores}, None)
+
+
+def test_extinction_and_all_dead():
+    """Test if the extinction and all dead criteria check the
+    totals"""
+    assert Extinction('Carnivore').check(state(5, 0)) == \
+        'Carnivore extinct'
+    assert Extinction('Herbivore').check(state(5, 0)) is None
+    assert AllDead().check(state(5, 0)) is None
+    assert AllDead().check(state(0, 0)) == 'all animals dead'
+
+
+def test_steady_state():
+    """Test if the steady state criterion waits for a full window of
+    totals within the tolerance band"""
+    criterion = SteadyState(window=3, tolerance=0.1)
+    criterion.start()
+    assert criterion.check(state(100, 10)) is None
+    assert criterion.check(state(104, 10)) is None
+    assert criterion.check(state(120, 10)) is None
+    assert criterion.check(state(121, 10)) is None
+    assert criterion.check(state(118, 10)) is not None
+
+
+def test_steady_state_rolling_window():
+    """Test if the rolling sums and extremes of the window give the
+    same answers as the totals of the window taken again each year"""
+    rng = np.random.RandomState(3)
+    totals = rng.randint(95, 106, size=(300, 2))
+    criterion = SteadyState(window=7, tolerance=0.08)
+    criterion.start()
+    for year in range(len(totals)):
+        window = totals[max(0, year - 6):year + 1]
+        expected = len(window) == 7 and all(
+            window[:, i].max() - window[:, i].min() <=
+            0.08 * window[:, i].mean() for i in range(2))
+        reason = criterion.check(state(*totals[year].tolist()))
+        assert (reason is not None) == expected
+
+
+def test_simulate_stops_early():
+    """Test if the simulation stops after the year a criterion is met
+    and reports why"""
+    ini_pop = [
+        {"loc": (1, 2),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 20}]}]
+    t = BioSim(ISLAND_MAP, ini_pop, seed=1)
+    t.simulate(100, vis_years=None, stop_when=[Extinction('Carnivore')])
+    assert t.year == 1
+    assert t.stop_reason == 'Carnivore extinct'
+    t.simulate(3, vis_years=None, stop_when=[WallClockBudget(3600)])
+    assert t.year == 4
+    assert t.stop_reason is None